@@ -0,0 +1,118 @@
+# asset_manifest.py
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from metrics import Gauge
+
+# Seconds between background rescans of the assets directory; 0 turns them off
+ASSET_RESCAN_INTERVAL = float(os.getenv("ASSET_RESCAN_INTERVAL", "300"))
+
+asset_files = Gauge("asset_manifest_files", "Files in the asset manifest")
+asset_scan_timestamp = Gauge("asset_manifest_scan_timestamp_seconds", "Unix time of the last asset scan")
+missing_images = Gauge("monument_missing_images", "Catalog monuments whose image is not in the asset manifest")
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class AssetEntry:
+    """Size, modification time and content hash of one asset file"""
+
+    __slots__ = ("path", "size", "mtime", "sha256")
+
+    def __init__(self, path, size, mtime, sha256):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.sha256 = sha256
+
+class AssetManifest:
+    """
+    In-memory index of every file under an assets directory, keyed by its
+    path relative to that directory ("Boudhanath_Stupa.jpg").
+
+    refresh() rescans the directory and swaps in a new index atomically;
+    files whose size and mtime did not change keep their previous hash.
+    Lookups never touch the filesystem.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.scanned_at = None
+        # Bumped whenever a scan finds files added or removed
+        self.version = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, path):
+        return path in self._entries
+
+    def get(self, path):
+        return self._entries.get(path)
+
+    def refresh(self):
+        """Rescan the directory; returns the number of files found"""
+        with self._lock:
+            previous = self._entries
+            entries = {}
+            for path in self.root.rglob("*"):
+                try:
+                    if not path.is_file():
+                        continue
+                    stat = path.stat()
+                    key = path.relative_to(self.root).as_posix()
+                    old = previous.get(key)
+                    if old is not None and old.size == stat.st_size and old.mtime == stat.st_mtime:
+                        entries[key] = old
+                    else:
+                        entries[key] = AssetEntry(key, stat.st_size, stat.st_mtime, file_sha256(path))
+                except OSError:
+                    # Removed or unreadable while scanning; the next scan will catch up
+                    continue
+            if entries.keys() != previous.keys():
+                self.version += 1
+            self._entries = entries
+            self.scanned_at = time.time()
+        asset_files.set(len(entries))
+        asset_scan_timestamp.set(self.scanned_at)
+        return len(entries)
+
+def image_path(image_url):
+    """Manifest key of a monument image URL ("/assets/x.jpg" -> "x.jpg")"""
+    return image_url.replace("/assets/", "")
+
+class MissingImages:
+    """
+    Keeps the monument_missing_images gauge current.
+
+    update() recounts only when the manifest's set of files or the catalog
+    snapshot changed since the last count, so it is cheap to call often.
+    """
+
+    def __init__(self, manifest):
+        self.manifest = manifest
+        self._counted = None
+        self._lock = threading.Lock()
+
+    def update(self, snapshot):
+        """Number of catalog monuments whose image is missing"""
+        if self.manifest.scanned_at is None:
+            # Nothing to compare against before the first scan
+            return None
+        with self._lock:
+            key = (self.manifest.version, snapshot.generation)
+            if key != self._counted:
+                missing_images.set(sum(
+                    1 for row in snapshot.monuments
+                    if row['image_url'] and image_path(row['image_url']) not in self.manifest
+                ))
+                self._counted = key
+            return missing_images.value()
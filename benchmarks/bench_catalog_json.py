@@ -0,0 +1,128 @@
+"""
+Requests per second of the full-catalog /getMonuments response, before and
+after pre-serialized catalog bytes.
+
+Runs offline on synthetic records (no database, no LLM). "before" is the old
+handler: one Monument model per row, validated and re-serialized by FastAPI
+through response_model. "after" serves the bytes cached for the catalog
+generation; its first request, which does the serialization, is reported
+separately.
+
+    python benchmarks/bench_catalog_json.py                      # 100, 10k, 100k monuments
+    python benchmarks/bench_catalog_json.py --sizes 100 10000 --seconds 5
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+import numpy as np
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import LRUCache
+from monument_json import Monument, monuments_json
+
+DEFAULT_SIZES = [100, 10_000, 100_000]
+
+# Nepal bounding box
+LAT_RANGE = (26.35, 30.45)
+LON_RANGE = (80.05, 88.20)
+
+TYPES = ['Hindu Temple', 'Buddhist Stupa', 'Historical Monument', 'Museum',
+         'Garden', 'Palace', 'Historical Site', 'Park', 'Cave']
+
+def synthetic_records(n_monuments, seed=0):
+    """Catalog records shaped like CatalogSnapshot.monuments"""
+    rng = np.random.default_rng(seed)
+    latitudes = rng.uniform(*LAT_RANGE, n_monuments)
+    longitudes = rng.uniform(*LON_RANGE, n_monuments)
+    popularity = rng.random(n_monuments)
+    types = rng.integers(0, len(TYPES), n_monuments)
+    return [
+        {
+            'id': i + 1,
+            'name': f"Monument {i + 1}",
+            'latitude': float(latitudes[i]),
+            'longitude': float(longitudes[i]),
+            'popularity': float(popularity[i]),
+            'indoor': i % 5 == 0,
+            'type': TYPES[types[i]],
+            # Real descriptions are a paragraph or two
+            'description': f"Monument {i + 1} is a {TYPES[types[i]].lower()} in Nepal. " * 8,
+            'image_url': f"/assets/monument_{i + 1}.jpg",
+            'location': "Kathmandu, Nepal",
+            'events': [],
+            'tags': [TYPES[types[i]]],
+            'best_time': 'morning',
+            'best_season': 'all',
+        }
+        for i in range(n_monuments)
+    ]
+
+def build_app(records):
+    app = FastAPI()
+    cache = LRUCache(maxsize=64)
+
+    @app.get("/before", response_model=List[Monument])
+    def before():
+        return [
+            Monument(
+                id=row['id'], name=row['name'], latitude=row['latitude'], longitude=row['longitude'],
+                popularity=row['popularity'], indoor=row['indoor'], type=row['type'],
+                description=row['description'], image_url=row['image_url'], location=row['location'],
+            )
+            for row in records
+        ]
+
+    @app.get("/after")
+    def after():
+        body = cache.get((None, None, None), 1)
+        if body is None:
+            body = monuments_json(records)
+            cache.put((None, None, None), body, 1)
+        return Response(body, media_type="application/json")
+
+    return app
+
+def requests_per_second(client, path, seconds, min_requests=3):
+    count = 0
+    start = time.perf_counter()
+    while count < min_requests or time.perf_counter() - start < seconds:
+        response = client.get(path)
+        assert response.status_code == 200
+        count += 1
+    return count / (time.perf_counter() - start), response
+
+def run_size(n_monuments, seconds):
+    records = synthetic_records(n_monuments)
+    client = TestClient(build_app(records))
+
+    start = time.perf_counter()
+    first = client.get("/after")
+    first_seconds = time.perf_counter() - start
+
+    before_rate, before_response = requests_per_second(client, "/before", seconds)
+    after_rate, after_response = requests_per_second(client, "/after", seconds)
+    assert before_response.json() == after_response.json() == first.json()
+
+    size_mb = len(after_response.content) / 1e6
+    print(f"{n_monuments:>9,} {size_mb:>9.2f} {before_rate:>12.1f} {after_rate:>12.1f}"
+          f" {after_rate / before_rate:>8.1f}x {first_seconds * 1000:>14.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--seconds', type=float, default=3.0, help="minimum time spent on each endpoint")
+    args = parser.parse_args()
+
+    print(f"{'monuments':>9} {'body MB':>9} {'before rps':>12} {'after rps':>12} {'speedup':>9} {'first after ms':>14}")
+    for n in args.sizes:
+        run_size(n, args.seconds)
+
+if __name__ == "__main__":
+    main()
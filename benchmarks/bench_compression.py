@@ -0,0 +1,74 @@
+"""
+CPU cost against bytes saved when compressing JSON responses.
+
+Compresses synthetic /getMonuments catalogs of 100, 10k and 100k monuments
+and a recommendation-sized response (10 monuments) with each gzip level and,
+when the brotli package is installed, brotli quality, and reports the
+compressed size, the time taken and the CPU spent per MB saved.
+
+/getMonuments bodies are compressed once per catalog version and then
+served from the compression cache, so their cost is paid once; other JSON
+responses (recommendations) pay it on every request.
+
+    python benchmarks/bench_compression.py
+    python benchmarks/bench_compression.py --sizes 10000 --gzip-levels 1 6 --brotli-qualities 4
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_catalog_json import DEFAULT_SIZES, synthetic_records
+from compression import brotli, compress
+from monument_json import monuments_json
+
+RECOMMENDATION_SIZE = 10
+
+def best_of(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def run_payload(label, body, codecs, repeat):
+    print(f"\n{label}: {len(body) / 1e6:.3f} MB uncompressed")
+    print(f"  {'codec':<10} {'MB':>9} {'ratio':>7} {'ms':>10} {'MB/s':>8} {'ms per MB saved':>16}")
+    for name, encoding, level in codecs:
+        if encoding == "br":
+            fn = lambda: compress(body, "br", brotli_quality=level)
+        else:
+            fn = lambda: compress(body, "gzip", gzip_level=level)
+        compressed, seconds = best_of(fn, repeat)
+        saved_mb = (len(body) - len(compressed)) / 1e6
+        per_saved = seconds * 1000 / saved_mb if saved_mb > 0 else float('inf')
+        print(f"  {name:<10} {len(compressed) / 1e6:>9.3f} {len(body) / len(compressed):>6.1f}x"
+              f" {seconds * 1000:>10.2f} {len(body) / 1e6 / seconds:>8.0f} {per_saved:>16.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--gzip-levels', type=int, nargs='+', default=[1, 6, 9])
+    parser.add_argument('--brotli-qualities', type=int, nargs='+', default=[1, 4, 11])
+    parser.add_argument('--repeat', type=int, default=3, help="runs per codec; the best is kept")
+    args = parser.parse_args()
+
+    codecs = [(f"gzip-{level}", "gzip", level) for level in args.gzip_levels]
+    if brotli is not None:
+        codecs += [(f"br-{quality}", "br", quality) for quality in args.brotli_qualities]
+    else:
+        print("brotli is not installed; gzip only")
+
+    records = synthetic_records(max(args.sizes + [RECOMMENDATION_SIZE]))
+    run_payload(f"recommendations ({RECOMMENDATION_SIZE} monuments)",
+                monuments_json(records[:RECOMMENDATION_SIZE]), codecs, args.repeat)
+    for n in args.sizes:
+        run_payload(f"catalog ({n:,} monuments)", monuments_json(records[:n]), codecs, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Speed of the vectorized distance functions against the old geopy loop.
+
+The old norm_distance called geopy.distance.geodesic once per monument in a
+Python loop. This times that loop against distance.haversine_km and
+distance.ellipsoidal_km for one user and 10k and 1M random monuments in
+Nepal, and reports the largest difference from geopy.
+
+The geopy loop takes minutes at 1M, so above --geopy-max points it is timed
+on a random sample of that many and scaled up (marked "extrapolated");
+pass --full to time it on every point.
+
+    python benchmarks/bench_distance.py                  # 10k and 1M monuments
+    python benchmarks/bench_distance.py --sizes 100000 --full
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from geopy.distance import geodesic
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from distance import ellipsoidal_km, haversine_km
+
+DEFAULT_SIZES = [10_000, 1_000_000]
+
+# Nepal bounding box
+LAT_RANGE = (26.35, 30.45)
+LON_RANGE = (80.05, 88.20)
+
+USER = (27.7104, 85.3487)
+
+def geopy_loop(lat, lon, lats, lons):
+    """The pre-vectorization norm_distance loop, without the normalization"""
+    curr_point = (lat, lon)
+    distance = np.zeros(len(lats))
+    for i in range(len(lats)):
+        distance[i] = geodesic(curr_point, (lats[i], lons[i])).km
+    return distance
+
+def best_of(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def run_size(n_monuments, geopy_max, repeat, seed=0):
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(*LAT_RANGE, n_monuments)
+    lons = rng.uniform(*LON_RANGE, n_monuments)
+
+    sample = np.arange(n_monuments)
+    if n_monuments > geopy_max:
+        sample = np.sort(rng.choice(n_monuments, geopy_max, replace=False))
+    start = time.perf_counter()
+    expected = geopy_loop(*USER, lats[sample], lons[sample])
+    geopy_seconds = (time.perf_counter() - start) * n_monuments / len(sample)
+    note = "" if len(sample) == n_monuments else f"  (extrapolated from {len(sample):,})"
+
+    print(f"\n{n_monuments:,} monuments")
+    print(f"  {'method':<12} {'ms':>12} {'speedup':>10} {'max error vs geopy':>20}")
+    print(f"  {'geopy loop':<12} {geopy_seconds * 1000:>12.1f} {'1.0x':>10} {'':>20}{note}")
+    for name, fn in (('haversine', haversine_km), ('ellipsoidal', ellipsoidal_km)):
+        distances, seconds = best_of(lambda: fn(*USER, lats, lons), repeat)
+        error = np.abs(distances[sample] - expected).max()
+        print(f"  {name:<12} {seconds * 1000:>12.1f} {geopy_seconds / seconds:>9.0f}x {error * 1000:>17.3f} m")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--geopy-max', type=int, default=20_000,
+                        help="time the geopy loop on at most this many points and scale up")
+    parser.add_argument('--full', action='store_true', help="time the geopy loop on every point")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per vectorized method; the best is kept")
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        run_size(n, n if args.full else args.geopy_max, args.repeat)
+
+if __name__ == "__main__":
+    main()
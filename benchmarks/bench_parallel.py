@@ -0,0 +1,132 @@
+"""
+Scaling of the shared-memory multi-process scorer across worker counts.
+
+Builds a synthetic catalog directly as arrays (no database), then times one
+full-catalog top-10 recommendation in-process and on 1..N worker processes,
+checking every run returns the same monuments as the in-process scorer.
+
+    python benchmarks/bench_parallel.py                          # 1M monuments, 1, 2, 4, ... cores
+    python benchmarks/bench_parallel.py --sizes 200000 2000000 --processes 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_index import EventIndex
+from monument_store import MonumentStore, TIME_SLOTS
+from parallel_scoring import ParallelScorer
+from recommendation import EventScoreVector, final_weight_sum, top_k
+
+# Nepal bounding box
+LAT_RANGE = (26.35, 30.45)
+LON_RANGE = (80.05, 88.20)
+
+TYPES = ['Buddhist Stupa', 'Cave', 'Garden', 'Hindu Temple', 'Historical Monument',
+         'Historical Site', 'Museum', 'Palace', 'Park']
+
+USER = {'latitude': 27.7104, 'longitude': 85.3487, 'likes': 'Hindu Temple'}
+
+class SyntheticSnapshot:
+    """Just the parts of a CatalogSnapshot the scorers read"""
+
+    def __init__(self, store, event_index, generation=1):
+        self.store = store
+        self.event_index = event_index
+        self.generation = generation
+
+def synthetic_snapshot(n_monuments, seed=0):
+    rng = np.random.default_rng(seed)
+    type_codes = rng.integers(0, len(TYPES), n_monuments).astype(np.int32)
+    store = MonumentStore(
+        ids=np.arange(1, n_monuments + 1, dtype=np.int64),
+        latitude=rng.uniform(*LAT_RANGE, n_monuments),
+        longitude=rng.uniform(*LON_RANGE, n_monuments),
+        popularity=rng.random(n_monuments),
+        indoor=np.arange(n_monuments) % 5 == 0,
+        type_codes=type_codes,
+        type_names=TYPES,
+        best_time_codes=rng.integers(0, len(TIME_SLOTS), n_monuments).astype(np.int8),
+        # One tag per monument: its type
+        tag_indptr=np.arange(n_monuments + 1, dtype=np.int64),
+        tag_indices=type_codes.astype(np.int64),
+        tag_names=TYPES,
+        records=None,
+    )
+
+    n_events = max(20, n_monuments // 100)
+    today = np.datetime64(datetime.now().date(), 'D')
+    start_dates = (today + rng.integers(-30, 365, n_events)).astype('datetime64[us]')
+    end_dates = start_dates + rng.integers(0, 10, n_events).astype('timedelta64[D]')
+    events_per_monument = rng.integers(0, 4, n_monuments)
+    indptr = np.zeros(n_monuments + 1, dtype=np.int64)
+    np.cumsum(events_per_monument, out=indptr[1:])
+    indices = rng.integers(0, n_events, indptr[-1]).astype(np.int64)
+    return SyntheticSnapshot(store, EventIndex(start_dates, end_dates, indptr, indices))
+
+def best_of(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def run_size(n_monuments, processes, repeat, limit):
+    print(f"\n{n_monuments:,} monuments, top {limit}")
+    snapshot = synthetic_snapshot(n_monuments)
+    user = dict(USER, current_time=datetime.now().hour, current_date=datetime.now())
+    event_score_vector = EventScoreVector()
+
+    def in_process():
+        date_scores = event_score_vector.get(snapshot, user['current_date'])
+        return top_k(final_weight_sum(user, snapshot.store, date_scores=date_scores), limit)
+
+    in_process()
+    expected, serial = best_of(in_process, repeat)
+    print(f"  {'in-process':<14} {serial * 1000:>10.1f} ms")
+
+    for count in processes:
+        scorer = ParallelScorer(count, min_monuments=0)
+        try:
+            # The first call copies the catalog to shared memory and warms the workers
+            start = time.perf_counter()
+            scorer.top_k(snapshot, user, limit)
+            warmup = time.perf_counter() - start
+            (rows, _), seconds = best_of(lambda: scorer.top_k(snapshot, user, limit), repeat)
+        finally:
+            scorer.close()
+        assert np.array_equal(rows, expected), f"{count} processes disagree with the in-process scorer"
+        print(f"  {f'{count} processes':<14} {seconds * 1000:>10.1f} ms"
+              f"   {serial / seconds:5.2f}x   (first call {warmup:.1f} s)")
+
+def default_processes():
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--processes', type=int, nargs='+', default=default_processes())
+    parser.add_argument('--repeat', type=int, default=5, help="runs per configuration; the best is kept")
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores available")
+    for n in args.sizes:
+        run_size(n, args.processes, args.repeat, args.limit)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Recommendation pipeline benchmark on synthetic catalogs.
+
+Runs offline: the catalog is generated inside an SQLite database standing in
+for MySQL, then each stage of the pipeline is timed and its peak traced memory
+recorded.
+
+    python benchmarks/bench_recommendation.py                    # 100, 10k, 100k, 1M
+    python benchmarks/bench_recommendation.py --sizes 100 10000
+    python benchmarks/bench_recommendation.py --save             # write baseline.json
+    python benchmarks/bench_recommendation.py --compare          # diff against baseline.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import CatalogSnapshot, load_catalog_data, monument_catalog
+import recommendation
+from recommendation import (
+    calculate_date_score, final_weight_sum, norm_distance, recommend_monuments,
+    recommend_monuments_batch, scores_time_of_day, type_match,
+)
+from synthetic_catalog import LAT_RANGE, LON_RANGE, TYPES, seed_catalog
+
+BASELINE_FILE = Path(__file__).with_name("baseline.json")
+DEFAULT_SIZES = [100, 10_000, 100_000, 1_000_000]
+
+USER = (27.7104, 85.3487, 'Hindu Temple')
+
+def measure(fn, repeat=1):
+    """
+    Run fn repeat times untraced for timing, then once under tracemalloc.
+
+    Returns (result, best seconds, peak traced MiB). Timing and memory are
+    measured separately because tracemalloc slows allocation-heavy code a lot.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, best, peak / 2 ** 20
+
+def run_size(n_monuments, repeat, n_users):
+    """Benchmark every stage on one catalog size; returns {stage: {seconds, peak_mib}}"""
+    results = {}
+
+    def record(stage, fn, repeat=repeat):
+        value, seconds, peak = measure(fn, repeat)
+        results[stage] = {'seconds': seconds, 'peak_mib': peak}
+        print(f"  {stage:<28} {seconds * 1000:>11.3f} ms {peak:>10.1f} MiB")
+        return value
+
+    print(f"\n{n_monuments:,} monuments")
+    start = time.perf_counter()
+    _, Session = seed_catalog(n_monuments)
+    print(f"  (seeded in {time.perf_counter() - start:.1f} s)")
+
+    def fetch():
+        db = Session()
+        try:
+            return load_catalog_data(db)
+        finally:
+            db.close()
+
+    # DB fetch and snapshot construction are the cold path, run once
+    monuments_data, events_data = record('db_fetch', fetch, repeat=1)
+    snapshot = record('build_snapshot', lambda: CatalogSnapshot(monuments_data, events_data), repeat=1)
+    del monuments_data, events_data
+
+    # Point the process-wide catalog at the SQLite stand-in
+    monument_catalog.session_factory = Session
+    monument_catalog.invalidate()
+    monument_catalog.get()
+
+    store, event_index = snapshot.store, snapshot.event_index
+    now = datetime.now()
+    user = {'latitude': USER[0], 'longitude': USER[1], 'likes': USER[2]}
+    record('norm_distance', lambda: norm_distance(USER[0], USER[1], store))
+    record('type_match', lambda: type_match(USER[2], store))
+    record('calculate_date_score', lambda: calculate_date_score(now, event_index))
+    record('scores_time_of_day', lambda: scores_time_of_day(now.hour, store))
+    record('final_weight_sum', lambda: final_weight_sum(user, store, event_index))
+    record('recommend_top10', lambda: recommend_monuments(*USER, limit=10))
+    record('recommend_all', lambda: recommend_monuments(*USER), repeat=1)
+    record('recommend_radius5km_top10', lambda: recommend_monuments(*USER, radius_km=5, limit=10))
+
+    # Batch endpoint against one call per user, for the same users
+    rng = np.random.default_rng(1)
+    users = [(float(lat), float(lon), TYPES[t]) for lat, lon, t in zip(
+        rng.uniform(*LAT_RANGE, n_users), rng.uniform(*LON_RANGE, n_users), rng.integers(0, len(TYPES), n_users))]
+    batch = record('batch_top10', lambda: recommend_monuments_batch(users, limit=10), repeat=1)
+    record('per_request_top10', lambda: [recommend_monuments(*u, limit=10) for u in users], repeat=1)
+    assert len(batch) == n_users
+    print(f"  batch speedup over per-request: "
+          f"{results['per_request_top10']['seconds'] / results['batch_top10']['seconds']:.1f}x ({n_users} users)")
+
+    return results
+
+def compare(current, baseline):
+    """Print current timings relative to the saved baseline"""
+    print("\nAgainst baseline (current / baseline time):")
+    for size, stages in current.items():
+        base_stages = baseline.get('results', {}).get(size)
+        if not base_stages:
+            print(f"  {size}: no baseline")
+            continue
+        for stage, numbers in stages.items():
+            base = base_stages.get(stage)
+            if base:
+                ratio = numbers['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+                flag = "  <-- slower" if ratio > 1.5 else ""
+                print(f"  {size:>9} {stage:<28} {ratio:6.2f}x{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=5, help="runs per hot-path stage; the best is kept")
+    parser.add_argument('--users', type=int, default=200, help="users in the batch vs per-request comparison")
+    parser.add_argument('--save', action='store_true', help=f"write results to {BASELINE_FILE.name}")
+    parser.add_argument('--compare', action='store_true', help=f"compare against {BASELINE_FILE.name}")
+    args = parser.parse_args()
+
+    # Keep the optional result cache out of the measurements
+    recommendation.recommendation_cache.maxsize = 0
+
+    results = {}
+    for n in args.sizes:
+        results[str(n)] = run_size(n, args.repeat, args.users)
+
+    if args.compare:
+        if BASELINE_FILE.exists():
+            compare(results, json.loads(BASELINE_FILE.read_text()))
+        else:
+            print(f"\nNo baseline at {BASELINE_FILE}; run with --save first")
+
+    if args.save:
+        baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+        baseline.setdefault('results', {}).update(results)
+        baseline['machine'] = {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+        }
+        baseline['recorded_at'] = datetime.now().isoformat(timespec='seconds')
+        BASELINE_FILE.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"\nSaved baseline to {BASELINE_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Synthetic monument catalogs in an in-memory SQLite database.
+
+Shared by the benchmarks and the tests so they exercise the same schema and
+data: monuments spread over Nepal with one type tag and one best time slot
+each, and up to three events per monument around today.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models import Base, DaySlot, Event, Monument, MonumentEvent, MonumentSlot, Tag, monument_tag
+
+# Nepal bounding box
+LAT_RANGE = (26.35, 30.45)
+LON_RANGE = (80.05, 88.20)
+
+TYPES = ['Hindu Temple', 'Buddhist Stupa', 'Historical Monument', 'Museum',
+         'Garden', 'Palace', 'Historical Site', 'Park', 'Cave']
+SLOTS = ['morning', 'afternoon', 'evening']
+
+def seed_catalog(n_monuments, seed=0):
+    """In-memory SQLite catalog of n_monuments synthetic monuments; returns (engine, session factory)"""
+    rng = np.random.default_rng(seed)
+    # One connection shared by every thread, so worker threads see the same in-memory database
+    engine = create_engine("sqlite://", connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    n_events = max(20, n_monuments // 100)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    starts = [today + timedelta(days=int(d)) for d in rng.integers(-30, 365, n_events)]
+
+    lats = rng.uniform(*LAT_RANGE, n_monuments)
+    lons = rng.uniform(*LON_RANGE, n_monuments)
+    types = rng.integers(0, len(TYPES), n_monuments)
+    events_per_monument = rng.integers(0, 4, n_monuments)
+    event_ids = rng.integers(1, n_events + 1, events_per_monument.sum())
+    slot_ids = rng.integers(1, len(SLOTS) + 1, n_monuments)
+
+    with engine.begin() as conn:
+        conn.execute(insert(Tag.__table__), [{'tag_id': i + 1, 'tag_name': t} for i, t in enumerate(TYPES)])
+        conn.execute(insert(DaySlot.__table__), [{'slot_id': i + 1, 'slot_name': s} for i, s in enumerate(SLOTS)])
+        conn.execute(insert(Event.__table__), [
+            {'event_id': i + 1, 'name': f"Event {i}", 'start_date': start,
+             'end_date': start + timedelta(days=int(rng.integers(0, 10))), 'related_type': TYPES[i % len(TYPES)]}
+            for i, start in enumerate(starts)
+        ])
+        conn.execute(insert(Monument.__table__), [
+            {'monument_id': i + 1, 'name': f"Monument {i}", 'latitude': float(lats[i]),
+             'longitude': float(lons[i]), 'popularity': float(rng.random()), 'indoor': bool(i % 5 == 0),
+             'location': "Nepal", 'type': TYPES[types[i]], 'description': "Synthetic monument " * 10,
+             'image_url': f"/assets/monument_{i}.jpg"}
+            for i in range(n_monuments)
+        ])
+        monument_ids = np.repeat(np.arange(1, n_monuments + 1), events_per_monument)
+        pairs = sorted({(int(m), int(e)) for m, e in zip(monument_ids, event_ids)})
+        if pairs:
+            conn.execute(insert(MonumentEvent.__table__), [
+                {'monument_id': m, 'event_id': e, 'name': f"Event {e - 1}"} for m, e in pairs
+            ])
+        conn.execute(insert(MonumentSlot.__table__), [
+            {'monument_id': i + 1, 'slot_id': int(slot_ids[i])} for i in range(n_monuments)
+        ])
+        conn.execute(insert(monument_tag), [
+            {'monument_id': i + 1, 'tag_id': int(types[i]) + 1} for i in range(n_monuments)
+        ])
+    return engine, Session
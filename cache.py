@@ -0,0 +1,81 @@
+# cache.py
+import threading
+from collections import OrderedDict
+from metrics import Gauge
+
+# Exposed in /metrics for caches given a name
+cache_hits = Gauge("cache_hits", "Lookups answered from the cache since startup", ["cache"])
+cache_misses = Gauge("cache_misses", "Lookups not found in the cache since startup", ["cache"])
+cache_entries = Gauge("cache_entries", "Entries currently held in the cache", ["cache"])
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with a size bound and hit/miss counters.
+
+    Entries belong to one catalog generation; looking up or storing with a
+    newer generation drops everything cached for the old catalog, while
+    lookups with an older one (requests still holding the previous snapshot)
+    miss and are not stored. A maxsize of 0 disables the cache. A named
+    cache reports its counters in /metrics.
+    """
+
+    def __init__(self, maxsize=1024, name=None):
+        self.maxsize = maxsize
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._generation = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _check_generation(self, generation):
+        """Whether generation is current, dropping the entries of an older one it replaces"""
+        if generation != self._generation:
+            if generation is not None and self._generation is not None and generation < self._generation:
+                return False
+            self._entries.clear()
+            self._generation = generation
+        return True
+
+    def _report(self):
+        if self.name is not None:
+            cache_hits.set(self.hits, self.name)
+            cache_misses.set(self.misses, self.name)
+            cache_entries.set(len(self._entries), self.name)
+
+    def get(self, key, generation=None):
+        """Cached value for key, or None"""
+        with self._lock:
+            value = self._entries.get(key) if self._check_generation(generation) else None
+            if value is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            self._report()
+            return value
+
+    def put(self, key, value, generation=None):
+        with self._lock:
+            if not self._check_generation(generation):
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._report()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._report()
+
+    def stats(self):
+        return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,326 @@
+# catalog.py
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+import numpy as np
+from datetime import datetime
+from itertools import chain
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, subqueryload
+from database import SessionLocal
+from models import Monument, Event, MonumentEvent, DaySlot, MonumentSlot, Tag, User, monument_tag
+from distance import unit_vectors
+from event_index import build_event_index
+from monument_store import MonumentStore
+from spatial import NearbyGraph, SpatialIndex
+
+# Seconds between cheap "did the tables change?" checks against the database
+CATALOG_CHECK_INTERVAL = float(os.getenv("CATALOG_CHECK_INTERVAL", "30"))
+
+# Writes to any of these models invalidate the in-memory catalog
+CATALOG_MODELS = (Monument, Event, MonumentEvent, DaySlot, MonumentSlot, Tag)
+
+def get_monuments_data(db: Session):
+    """
+    Fetch all monuments from the database with their related information.
+
+    Events, day slots and tags are eager loaded so the whole graph costs four
+    queries no matter how many monuments there are. subqueryload is used for
+    the collections because selectinload batches its IN lists and would issue
+    more queries as the table grows.
+    """
+    return db.query(Monument).options(
+        subqueryload(Monument.monument_events).joinedload(MonumentEvent.event),
+        subqueryload(Monument.slots).joinedload(MonumentSlot.slot),
+        subqueryload(Monument.tags),
+    ).all()
+
+def get_events_data(db: Session):
+    """
+    Fetch all events from the database
+    """
+    return db.query(Event).all()
+
+def get_user_preference_tags(db: Session, user_id):
+    """
+    Fetch the names of a user's preference tags
+    """
+    rows = db.query(Tag.tag_name).join(Tag.users).filter(User.user_id == user_id).all()
+    return [tag_name for (tag_name,) in rows]
+
+def monument_to_dict(monument):
+    """Convert monument object to dictionary"""
+    return {
+        'id': monument.monument_id,
+        'name': monument.name,
+        'latitude': monument.latitude,
+        'longitude': monument.longitude,
+        'type': monument.type,
+        'popularity': monument.popularity,
+        'indoor': monument.indoor,
+        'description': monument.description,
+        'image_url': monument.image_url,
+        'location': monument.location
+    }
+
+def get_monument_events(monument):
+    """
+    Get event names associated with a monument using the relationship
+    """
+    if hasattr(monument, 'monument_events') and monument.monument_events:
+        return [me.event.name for me in monument.monument_events]
+    return []
+
+def get_monument_best_time(monument, db: Session):
+    """
+    Get the best time to visit a monument based on its slots
+    """
+    if hasattr(monument, 'slots') and monument.slots:
+        slot_names = [slot.slot.slot_name for slot in monument.slots]
+        # Find the most common time slot
+        if slot_names:
+            # print(max(set(slot_names), key=slot_names.count))
+            return max(set(slot_names), key=slot_names.count)
+    return None  # Default if no slots defined
+
+def load_catalog_data(db: Session):
+    """
+    Load monuments (with events and best time) and events as lists of dicts
+    """
+    monuments = get_monuments_data(db)
+    events = get_events_data(db)
+    
+    # Process monument data
+    monuments_data = []
+    for monument in monuments:
+        monument_dict = monument_to_dict(monument)
+        
+        # Add events
+        monument_dict['events'] = get_monument_events(monument)
+        
+        # Add tags
+        monument_dict['tags'] = [tag.tag_name for tag in monument.tags]
+        
+        # Add best time if available from day slots
+        best_time = get_monument_best_time(monument, db)
+        if best_time:
+            monument_dict['best_time'] = best_time
+        else:
+            # Default based on type if no slot info
+            if monument.type in ['Hindu Temple', 'Buddhist Stupa']:
+                monument_dict['best_time'] = 'morning'
+            elif monument.type in ['Museum', 'Historical Monument']:
+                monument_dict['best_time'] = 'afternoon'
+            else:
+                monument_dict['best_time'] = 'afternoon'
+        
+        # Determine best season (simplified - could be expanded based on your needs)
+        monument_dict['best_season'] = 'all'
+        
+        monuments_data.append(monument_dict)
+    
+    # Process event data
+    events_data = []
+    for event in events:
+        event_dict = {
+            'name': event.name,
+            'start_date': event.start_date.strftime('%Y-%m-%d') if event.start_date else None,
+            'end_date': event.end_date.strftime('%Y-%m-%d') if event.end_date else None,
+            'related_type': event.related_type
+        }
+        events_data.append(event_dict)
+    
+    return monuments_data, events_data
+
+def catalog_version(db: Session):
+    """
+    Cheap fingerprint of the catalog tables, fetched in a single round trip.
+
+    Row counts catch deletes and max(updated_at) catches inserts and in-place
+    edits, from any process or worker; max keys are kept as a cheap extra
+    signal. Edits made through this process are also picked up immediately
+    by the session hooks below.
+    """
+    def stats(*columns):
+        return [select(func.count()).select_from(columns[0].table).scalar_subquery()] + [
+            select(func.max(column)).scalar_subquery() for column in columns
+        ]
+
+    row = db.execute(select(
+        *stats(Monument.monument_id, Monument.updated_at),
+        *stats(Event.event_id, Event.start_date, Event.end_date, Event.updated_at),
+        *stats(MonumentEvent.monument_id, MonumentEvent.event_id, MonumentEvent.updated_at),
+        *stats(MonumentSlot.monument_id, MonumentSlot.slot_id, MonumentSlot.updated_at),
+        *stats(DaySlot.slot_id, DaySlot.updated_at),
+        *stats(Tag.tag_id, Tag.updated_at),
+        *stats(monument_tag.c.monument_id, monument_tag.c.tag_id, monument_tag.c.updated_at),
+    )).one()
+    return tuple(row)
+
+# Rebuild the nearby graph from scratch rather than extend it past this many added monuments
+NEARBY_MAX_ADDED = 256
+
+def nearby_graph_for(store, previous=None):
+    """
+    Nearby graph for a new snapshot.
+
+    When the previous snapshot's monuments are all still there, unmoved, and
+    only a few were added, its graph is extended instead of rebuilt.
+    """
+    if previous is not None and 0 < len(previous.store) <= len(store) <= len(previous.store) + NEARBY_MAX_ADDED:
+        by_id = np.argsort(store.ids)
+        positions = np.searchsorted(store.ids, previous.store.ids, sorter=by_id)
+        positions = np.minimum(positions, len(store) - 1)
+        previous_rows = by_id[positions]
+        if (
+            np.array_equal(store.ids[previous_rows], previous.store.ids)
+            and np.array_equal(store.latitude[previous_rows], previous.store.latitude)
+            and np.array_equal(store.longitude[previous_rows], previous.store.longitude)
+        ):
+            return NearbyGraph.extend(previous.nearby_graph, previous_rows, store.latitude, store.longitude)
+    return NearbyGraph.build(store.latitude, store.longitude)
+
+class CatalogSnapshot:
+    """Immutable view of the catalog shared by all requests"""
+
+    def __init__(self, monuments_data, events_data, fingerprint=None, generation=0, previous=None):
+        self.store = MonumentStore.from_records(monuments_data)
+        self.event_index = build_event_index([m['events'] for m in monuments_data], events_data)
+        self.spatial_index = SpatialIndex(self.store.latitude, self.store.longitude)
+        # For finding the farthest monument from a user with one dot product
+        self.units = unit_vectors(self.store.latitude, self.store.longitude)
+        self.nearby_graph = nearby_graph_for(self.store, previous)
+        self.rows_by_id = {int(monument_id): row for row, monument_id in enumerate(self.store.ids)}
+        # Rows in monument_id order, for keyset pagination
+        self.id_order = np.argsort(self.store.ids, kind='stable')
+        self.sorted_ids = self.store.ids[self.id_order]
+        self.fingerprint = fingerprint
+        # Process-local build counter, bumped on every rebuild
+        self.generation = generation
+        self.built_at = datetime.now()
+        self._version = None
+        self._version_lock = threading.Lock()
+
+    @property
+    def monuments(self):
+        return self.store.records
+
+    @property
+    def version(self):
+        """
+        Content hash of the monument records, computed on first use.
+
+        Unlike generation it is the same in every process serving the same
+        data, so it can be handed to clients (e.g. as an ETag).
+        """
+        if self._version is None:
+            with self._version_lock:
+                if self._version is None:
+                    payload = json.dumps(self.monuments, default=str, separators=(',', ':'))
+                    self._version = hashlib.sha256(payload.encode()).hexdigest()
+        return self._version
+
+    def rows_after(self, after=None, limit=None):
+        """Rows of up to limit monuments with ids greater than after, in id order"""
+        start = 0 if after is None else int(np.searchsorted(self.sorted_ids, after, side='right'))
+        end = len(self.sorted_ids) if limit is None else start + limit
+        return self.id_order[start:end]
+
+def build_snapshot(db: Session, fingerprint=None, generation=0, previous=None):
+    """Load the catalog from the database into a new snapshot"""
+    monuments_data, events_data = load_catalog_data(db)
+    return CatalogSnapshot(monuments_data, events_data, fingerprint=fingerprint,
+                           generation=generation, previous=previous)
+
+# Every live catalog, so session hooks can invalidate them
+_catalogs = weakref.WeakSet()
+
+class Catalog:
+    """
+    Process-wide catalog snapshot.
+
+    The snapshot is built once and shared; it is rebuilt (and swapped in
+    atomically) only when the table fingerprint changes or after invalidate().
+    Only the first build makes callers wait: while one thread checks the
+    fingerprint or rebuilds, other callers are served the current snapshot.
+    """
+
+    def __init__(self, session_factory=SessionLocal, check_interval=CATALOG_CHECK_INTERVAL):
+        self.session_factory = session_factory
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._stale = True
+        self._generation = 0
+        self._lock = threading.Lock()
+        _catalogs.add(self)
+
+    def invalidate(self):
+        """Force a rebuild on the next get()"""
+        self._stale = True
+
+    def _is_fresh(self):
+        return (
+            self._snapshot is not None
+            and not self._stale
+            and time.monotonic() - self._checked_at < self.check_interval
+        )
+
+    def get(self):
+        """Return the current snapshot, rebuilding it first if the tables changed"""
+        snapshot = self._snapshot
+        if self._is_fresh():
+            return snapshot
+
+        # Only the first build blocks; while one thread checks or rebuilds, the rest keep serving the current snapshot
+        if not self._lock.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            # Another thread may have refreshed it while we were waiting
+            if self._is_fresh():
+                return self._snapshot
+
+            db = self.session_factory()
+            try:
+                fingerprint = catalog_version(db)
+                snapshot = self._snapshot
+                if snapshot is None or self._stale or snapshot.fingerprint != fingerprint:
+                    # Cleared before loading so invalidations during the build are not lost
+                    self._stale = False
+                    try:
+                        snapshot = build_snapshot(db, fingerprint, self._generation + 1, previous=snapshot)
+                    except Exception:
+                        self._stale = True
+                        raise
+                    self._generation += 1
+                    self._snapshot = snapshot
+                self._checked_at = time.monotonic()
+                return snapshot
+            finally:
+                db.close()
+        finally:
+            self._lock.release()
+
+def invalidate_catalogs():
+    """Invalidate every catalog in this process"""
+    for catalog in list(_catalogs):
+        catalog.invalidate()
+
+@event.listens_for(Session, "after_flush")
+def _track_catalog_writes(session, flush_context):
+    if any(isinstance(obj, CATALOG_MODELS) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info['catalog_dirty'] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop('catalog_dirty', False):
+        invalidate_catalogs()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop('catalog_dirty', None)
+
+monument_catalog = Catalog()
@@ -0,0 +1,137 @@
+# compression.py
+import asyncio
+import gzip
+import os
+from starlette.datastructures import Headers, MutableHeaders
+from cache import LRUCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "1").lower() in ("1", "true", "yes")
+# JSON bodies smaller than this many bytes are sent as they are
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# Brotli is used when the brotli package is installed; 11 (its default) is far too slow per request
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+# Compressed bodies of ETagged responses, by (ETag, encoding)
+COMPRESSION_CACHE_SIZE = int(os.getenv("COMPRESSION_CACHE_SIZE", "64"))
+
+# Bodies at least this large are compressed on a worker thread instead of the event loop
+THREAD_MIN_SIZE = 1 << 16
+
+# Preferred first
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+def negotiate(accept_encoding):
+    """The preferred encoding the client accepts, or None"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+def compress(body, encoding, gzip_level=GZIP_LEVEL, brotli_quality=BROTLI_QUALITY):
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing JSON responses with brotli or gzip.
+
+    Only complete (non-streaming) 200 responses of COMPRESSION_MIN_SIZE bytes
+    or more are compressed, and never ones that already carry a
+    Content-Encoding. Responses with a strong ETag, such as /getMonuments
+    whose ETag names the catalog version and query, are compressed once and
+    then served from a cache; their ETag is sent weak, so If-None-Match
+    still matches it. A 304 sent to a client that accepts an encoding gets
+    the same Vary and weak ETag as the compressed 200 it revalidates.
+    """
+
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_SIZE, cache_size=COMPRESSION_CACHE_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = LRUCache(maxsize=cache_size, name="compression")
+
+    def compressible(self, start, body):
+        headers = Headers(raw=start.get("headers", []))
+        return (
+            start["status"] == 200
+            and len(body) >= self.minimum_size
+            and "content-encoding" not in headers
+            and headers.get("content-type", "").startswith("application/json")
+        )
+
+    async def compressed_body(self, body, encoding, etag):
+        key = (etag, encoding)
+        cacheable = etag is not None and not etag.startswith("W/")
+        compressed = self.cache.get(key) if cacheable else None
+        if compressed is None:
+            if len(body) >= THREAD_MIN_SIZE:
+                compressed = await asyncio.to_thread(compress, body, encoding)
+            else:
+                compressed = compress(body, encoding)
+            if cacheable:
+                self.cache.put(key, compressed)
+        return compressed
+
+    def encoded_start(self, start, encoding=None, length=None):
+        """start with Vary: Accept-Encoding and a weak ETag, plus Content-Encoding and Content-Length when given"""
+        headers = MutableHeaders(raw=list(start.get("headers", [])))
+        if encoding is not None:
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(length)
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag is not None and not etag.startswith("W/"):
+            headers["etag"] = f"W/{etag}"
+        return dict(start, headers=headers.raw)
+
+    async def __call__(self, scope, receive, send):
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", "")) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Held back until the body shows whether it is worth compressing
+                start = message
+                return
+            if message["type"] == "http.response.body" and start is not None:
+                held, start = start, None
+                body = message.get("body", b"")
+                if held["status"] == 304:
+                    # Must carry the same Vary and ETag as the compressed 200 it stands in for
+                    await send(self.encoded_start(held))
+                    await send(message)
+                    return
+                if message.get("more_body", False) or not self.compressible(held, body):
+                    await send(held)
+                    await send(message)
+                    return
+                etag = Headers(raw=held.get("headers", [])).get("etag")
+                compressed = await self.compressed_body(body, encoding, etag)
+                await send(self.encoded_start(held, encoding, len(compressed)))
+                await send({"type": "http.response.body", "body": compressed})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,131 @@
+# distance.py
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# WGS-84 ellipsoid, the same one geopy.distance.geodesic uses by default
+WGS84_A = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+
+def haversine_km(lat, lon, lats, lons):
+    """
+    Great-circle distance in km from (lat, lon) to every point in (lats, lons).
+
+    Accepts scalars or arrays and broadcasts them, so one call covers a whole catalog.
+    """
+    lat1 = np.radians(lat)
+    lon1 = np.radians(lon)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lons, dtype=np.float64))
+
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def ellipsoidal_km(lat, lon, lats, lons, max_iter=200, tol=1e-12):
+    """
+    Distance in km on the WGS-84 ellipsoid (Vincenty's inverse formula), vectorized.
+
+    Agrees with geopy's geodesic to well under a metre. Points that fail to
+    converge (nearly antipodal pairs) fall back to the haversine distance.
+    """
+    lat1 = np.radians(lat)
+    lon1 = np.radians(lon)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lons, dtype=np.float64))
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(lat1, lon1, lat2, lon2)
+
+    f = WGS84_F
+    L = lon2 - lon1
+    U1 = np.arctan((1 - f) * np.tan(lat1))
+    U2 = np.arctan((1 - f) * np.tan(lat2))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    converged = np.zeros(L.shape, dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(max_iter):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.sqrt((cosU2 * sin_lam) ** 2 + (cosU1 * sinU2 - sinU1 * cosU2 * cos_lam) ** 2)
+            cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cosU1 * cosU2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            # Equatorial lines have cos2_alpha == 0, where cos_2sigma_m is defined as 0
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha)
+            C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            lam_prev = lam
+            lam = L + (1 - C) * f * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+            )
+            converged = np.abs(lam - lam_prev) < tol
+            if converged.all():
+                break
+
+        u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+        ))
+        distance = WGS84_B * A * (sigma - delta_sigma)
+
+    # Coincident points
+    distance = np.where(sin_sigma == 0, 0.0, distance)
+
+    failed = ~converged | ~np.isfinite(distance)
+    if failed.any():
+        distance = np.where(failed, haversine_km(lat, lon, lats, lons), distance)
+    return distance
+
+DISTANCE_METHODS = {
+    'haversine': haversine_km,
+    'ellipsoidal': ellipsoidal_km,
+}
+
+def unit_vectors(lats, lons):
+    """Points as 3-D unit vectors (..., 3); the dot product of two is the cosine of their central angle"""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+# Geodesic and great-circle distances differ by well under 1%, so the farthest
+# point by either method is within this share of the farthest great-circle distance
+FARTHEST_SLACK = 0.02
+
+def farthest_km(lat, lon, lats, lons, units=None, method='haversine'):
+    """
+    Largest distance in km from (lat, lon) to any of the points.
+
+    Central angles come from one dot product with the points' unit vectors;
+    exact distances are only computed for the points close to the largest angle.
+    """
+    if len(lats) == 0:
+        return 0.0
+    if units is None:
+        units = unit_vectors(lats, lons)
+    cos_angle = units @ unit_vectors(lat, lon)
+    max_angle = np.arccos(np.clip(cos_angle.min(), -1.0, 1.0))
+    # The absolute margin covers arccos precision for tiny angles
+    threshold = np.cos(max_angle * (1 - FARTHEST_SLACK)) + 1e-9
+    candidates = np.flatnonzero(cos_angle <= threshold)
+    return float(distances_km(lat, lon, lats[candidates], lons[candidates], method=method).max())
+
+def distances_km(lat, lon, lats, lons, method='haversine'):
+    """Distances in km from one point to many, using the named method"""
+    try:
+        fn = DISTANCE_METHODS[method]
+    except KeyError:
+        raise ValueError(f"Unknown distance method '{method}', expected one of {sorted(DISTANCE_METHODS)}")
+    return fn(lat, lon, lats, lons)
+
+def pairwise_km(lats, lons, method='haversine'):
+    """Symmetric matrix of distances in km between all the given points"""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    return distances_km(lats[:, None], lons[:, None], lats[None, :], lons[None, :], method=method)
@@ -0,0 +1,48 @@
+# diversity.py
+import os
+import numpy as np
+
+# Best scored monuments considered for re-ranking
+DIVERSITY_POOL = int(os.getenv("DIVERSITY_POOL", "50"))
+# Monuments this far apart are about 37% as "similar" by location as two at the same spot
+DIVERSITY_DISTANCE_KM = float(os.getenv("DIVERSITY_DISTANCE_KM", "1.0"))
+# Share of the similarity that comes from a shared type; the rest is proximity
+DIVERSITY_TYPE_WEIGHT = float(os.getenv("DIVERSITY_TYPE_WEIGHT", "0.5"))
+
+def similarity(type_codes, distances, distance_km=DIVERSITY_DISTANCE_KM, type_weight=DIVERSITY_TYPE_WEIGHT):
+    """
+    Pairwise similarity in [0, 1] from shared type and proximity.
+
+    Monuments without a type (negative codes) never share one.
+    """
+    type_codes = np.asarray(type_codes)
+    same_type = (type_codes[:, None] == type_codes[None, :]) & (type_codes >= 0)
+    proximity = np.exp(-np.asarray(distances) / distance_km)
+    return type_weight * same_type + (1 - type_weight) * proximity
+
+def mmr_order(relevance, similarities, diversity, k=None):
+    """
+    Maximal marginal relevance ordering of the first k picks.
+
+    Each step picks the item with the best
+    (1 - diversity) * relevance - diversity * (max similarity to anything picked so far).
+    Relevance is rescaled to [0, 1] first so diversity weighs the same for
+    any score range. Ties go to the earlier item, so diversity 0 keeps the
+    given order.
+    """
+    relevance = np.asarray(relevance, dtype=np.float64)
+    n = len(relevance)
+    k = n if k is None else min(k, n)
+    spread = relevance.max() - relevance.min() if n else 0.0
+    scaled = (relevance - relevance.min()) / spread if spread > 0 else np.zeros(n)
+
+    order = np.empty(k, dtype=np.int64)
+    available = np.ones(n, dtype=bool)
+    redundancy = np.zeros(n)
+    for i in range(k):
+        gain = np.where(available, (1 - diversity) * scaled - diversity * redundancy, -np.inf)
+        pick = int(np.argmax(gain))
+        order[i] = pick
+        available[pick] = False
+        np.maximum(redundancy, similarities[pick], out=redundancy)
+    return order
@@ -0,0 +1,51 @@
+# event_index.py
+import numpy as np
+from monument_store import csr_from_lists
+
+class EventIndex:
+    """
+    Event calendar stored as arrays, built once per catalog snapshot.
+
+    start_dates / end_dates hold one datetime64 entry per event (NaT when a
+    date is missing). The monument -> event incidence matrix is kept in CSR
+    form: the events of monument i are indices[indptr[i]:indptr[i + 1]].
+    """
+
+    def __init__(self, start_dates, end_dates, indptr, indices):
+        self.start_dates = start_dates
+        self.end_dates = end_dates
+        self.indptr = indptr
+        self.indices = indices
+
+    @property
+    def n_monuments(self):
+        return len(self.indptr) - 1
+
+    @property
+    def n_events(self):
+        return len(self.start_dates)
+
+def build_event_index(monument_events, events_data):
+    """
+    Build the event index.
+
+    monument_events holds one list of event names per monument and events_data
+    one dict per event with 'name', 'start_date' and 'end_date' ('%Y-%m-%d' or None).
+    """
+    names = [event['name'] for event in events_data]
+    start_dates = np.array(
+        [event['start_date'] or 'NaT' for event in events_data], dtype='datetime64[D]'
+    ).astype('datetime64[us]')
+    end_dates = np.array(
+        [event['end_date'] or 'NaT' for event in events_data], dtype='datetime64[D]'
+    ).astype('datetime64[us]')
+
+    # Events are matched by name; the first event with a given name wins
+    position = {}
+    for i, name in enumerate(names):
+        position.setdefault(name, i)
+
+    # A monument scores the max over its events, so duplicates add nothing
+    indptr, indices = csr_from_lists(monument_events, position)
+
+    return EventIndex(start_dates, end_dates, indptr, indices)
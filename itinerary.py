@@ -0,0 +1,157 @@
+# itinerary.py
+import os
+import numpy as np
+from datetime import datetime
+from catalog import monument_catalog
+from distance import distances_km
+from recommendation import (
+    DISTANCE_METHOD, catalog_max_distance, distance_matrix, event_score_vector, final_weight_sum,
+    load_user_tags, monument_records, top_k,
+)
+
+# Average travel speed between stops and time spent at each stop
+ITINERARY_SPEED_KMH = float(os.getenv("ITINERARY_SPEED_KMH", "15"))
+ITINERARY_VISIT_MINUTES = float(os.getenv("ITINERARY_VISIT_MINUTES", "45"))
+ITINERARY_MAX_STOPS = int(os.getenv("ITINERARY_MAX_STOPS", "50"))
+
+def nearest_neighbour_route(dist):
+    """Open route over all nodes starting at node 0, always moving to the closest unvisited node"""
+    n = len(dist)
+    route = [0]
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, dist[route[-1]])
+        nxt = int(np.argmin(row))
+        route.append(nxt)
+        visited[nxt] = True
+    return np.array(route, dtype=np.int64)
+
+def two_opt(route, dist, max_passes=50):
+    """
+    Improve an open route with 2-opt moves; the first node stays fixed.
+
+    Reversing route[i:j + 1] replaces the edges (a, b) and (c, e) with (a, c)
+    and (b, e), where a, b = route[i - 1], route[i] and c, e = route[j], route[j + 1].
+    The gain of every j for a given i is computed at once.
+    """
+    route = route.copy()
+    n = len(route)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = route[i - 1], route[i]
+            c = route[i + 1:]
+            # The last node has no successor, so reversing up to it only changes one edge
+            e = np.append(route[i + 2:], -1)
+            after = np.where(e >= 0, dist[b, e], 0.0)
+            before = np.where(e >= 0, dist[c, e], 0.0)
+            gain = dist[a, b] + before - dist[a, c] - after
+            j = int(np.argmax(gain))
+            if gain[j] > 1e-9:
+                j += i + 1
+                route[i:j + 1] = route[i:j + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return route
+
+def route_km(route, dist):
+    """Length of each leg of a route"""
+    return dist[route[:-1], route[1:]]
+
+def plan_route(dist):
+    """Short open route over all nodes starting at node 0 (nearest neighbour, then 2-opt)"""
+    return two_opt(nearest_neighbour_route(dist), dist)
+
+def plan_itinerary(user_lat=27.7104, user_long=85.3487, preferred_type="Hindu Temple",
+                   time_budget_minutes=240, max_stops=None, user_id=None):
+    """
+    Plan a route through the best recommended monuments.
+
+    The best scored monuments reachable within the time budget become stops;
+    they are ordered from the user's position with nearest neighbour + 2-opt,
+    and the lowest scored stop is dropped until travel and visits fit the budget.
+
+    Parameters:
+    - user_lat, user_long: float - starting position
+    - preferred_type: str - type of monument the user prefers
+    - time_budget_minutes: float - total time for travel and visits
+    - max_stops: int - at most this many stops (default and cap: ITINERARY_MAX_STOPS)
+    - user_id: int - personalize by the user's preference tags (optional)
+
+    Returns:
+    - Dict with the ordered 'stops' (monument objects with 'leg_km' and
+      'arrival_minute'), 'total_km' and 'total_minutes'
+    """
+    plan = {'stops': [], 'total_km': 0.0, 'total_minutes': 0.0}
+    now = datetime.now()
+    user = {
+        'latitude': user_lat,
+        'longitude': user_long,
+        'likes': preferred_type,
+        'current_time': now.hour,
+        'current_date': now
+    }
+
+    try:
+        snapshot = monument_catalog.get()
+        if len(snapshot.store) == 0:
+            return plan
+        if user_id is not None:
+            user['tags'] = sorted(load_user_tags(user_id))
+
+        max_stops = min(max_stops or ITINERARY_MAX_STOPS, ITINERARY_MAX_STOPS,
+                        int(time_budget_minutes // ITINERARY_VISIT_MINUTES))
+        if max_stops <= 0:
+            return plan
+
+        # Anything farther than the budget allows for travel can never be reached
+        reach_km = ITINERARY_SPEED_KMH * (time_budget_minutes - ITINERARY_VISIT_MINUTES) / 60
+        candidates, _ = snapshot.spatial_index.nearby(user_lat, user_long, radius_km=reach_km)
+        if len(candidates) == 0:
+            return plan
+        # Scored exactly as recommend_monuments scores them: catalog order, catalog-wide distance scale
+        candidates = np.sort(candidates)
+        store = snapshot.store.take(candidates)
+        date_scores = event_score_vector.get(snapshot, now)[candidates]
+        max_distance = catalog_max_distance(snapshot, user_lat, user_long)
+        weights = final_weight_sum(user, store, date_scores=date_scores, max_distance=max_distance)
+        best = top_k(weights, max_stops)
+        rows = candidates[best]
+        weights = weights[best]
+
+        # Node 0 is the user's position, node i the i-th stop
+        dist = np.zeros((len(rows) + 1, len(rows) + 1))
+        dist[1:, 1:] = distance_matrix.between(snapshot, rows)
+        dist[0, 1:] = dist[1:, 0] = distances_km(
+            user_lat, user_long, snapshot.store.latitude[rows], snapshot.store.longitude[rows],
+            method=DISTANCE_METHOD
+        )
+
+        route = plan_route(dist)
+        while True:
+            legs = route_km(route, dist)
+            minutes = legs.sum() / ITINERARY_SPEED_KMH * 60 + ITINERARY_VISIT_MINUTES * (len(route) - 1)
+            if minutes <= time_budget_minutes or len(route) == 1:
+                break
+            # Drop the lowest scored stop and tidy the shortened route
+            worst = route[1:][np.argmin(weights[route[1:] - 1])]
+            route = two_opt(route[route != worst], dist)
+        if len(route) == 1:
+            return plan
+
+        stops = monument_records(snapshot.store, rows[route[1:] - 1])
+        elapsed = 0.0
+        for stop, leg in zip(stops, legs):
+            elapsed += leg / ITINERARY_SPEED_KMH * 60
+            stop['leg_km'] = float(leg)
+            stop['arrival_minute'] = elapsed
+            elapsed += ITINERARY_VISIT_MINUTES
+        plan['stops'] = stops
+        plan['total_km'] = float(legs.sum())
+        plan['total_minutes'] = float(minutes)
+        return plan
+    except Exception as e:
+        print(f"Error in itinerary planning: {str(e)}")
+        return plan
@@ -1,41 +1,106 @@
 import os
-from fastapi import Depends
-from sqlalchemy.orm import Session
-from database import engine, get_db
-from models import Monument as DBMonument
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Body
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Response, Body, Query
 from pathlib import Path
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from typing import Optional, List, Dict
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from langchain_community.llms import Ollama
 
 import json
+import hashlib
 import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from ConnectionManager import ConnectionManager
 from RAGAgent import RAGAgent
-from recommendation import recommend_monuments
+import recommendation
+from recommendation import (
+    event_score_vector, iter_monument_records, rank_monuments, recommend_monuments, recommend_monuments_batch,
+)
+from parallel_scoring import ParallelScorer, SCORING_PROCESSES
+from catalog import monument_catalog
+from itinerary import plan_itinerary, ITINERARY_MAX_STOPS
+from spatial import NEARBY_K
+from metrics import render_metrics
+from monument_json import Monument, monuments_json, monuments_json_cache
+from asset_manifest import AssetManifest, ASSET_RESCAN_INTERVAL, MissingImages
+from profiling import ServerTimingMiddleware, profiler, stage
+from compression import CompressionMiddleware, COMPRESSION_ENABLED
 from typing import Optional
 
-class Monument(BaseModel):
-    id: int
-    name: str
-    latitude: float
-    longitude: float
-    type: str
-    popularity: float
-    indoor: bool
-    type: str
-    description: str
-    image_url: str
-    location: str
 
-    class Config:
-        orm_mode = True
+app = FastAPI()
+app.add_middleware(ServerTimingMiddleware)
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
 
+# Recommendation work (DB reads and scoring) runs here so it never blocks the event loop
+RECOMMENDATION_WORKERS = int(os.getenv("RECOMMENDATION_WORKERS", "4"))
+recommendation_executor = ThreadPoolExecutor(
+    max_workers=RECOMMENDATION_WORKERS,
+    thread_name_prefix="recommendation"
+)
 
+async def run_in_recommendation_pool(fn, *args, **kwargs):
+    """Run a blocking function on the recommendation pool and await its result"""
+    loop = asyncio.get_running_loop()
+    # Run in a copy of the caller's context so stage timings reach the request
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(recommendation_executor, partial(context.run, fn, *args, **kwargs))
 
-app = FastAPI()
+# Upper bound on the event score refresher's sleep, so catalog edits are picked up promptly
+EVENT_SCORE_MAX_SLEEP = float(os.getenv("EVENT_SCORE_MAX_SLEEP", "60"))
+
+async def refresh_event_scores():
+    """
+    Keep the precomputed event score vector, and the missing-images gauge, current.
+
+    Wakes at the next event boundary (or every EVENT_SCORE_MAX_SLEEP seconds
+    to notice edited events), so requests only ever read the array.
+    """
+    while True:
+        try:
+            snapshot = await run_in_recommendation_pool(monument_catalog.get)
+            await run_in_recommendation_pool(event_score_vector.get, snapshot)
+            await run_in_recommendation_pool(missing_images.update, snapshot)
+            delay = event_score_vector.seconds_until_refresh()
+        except Exception as e:
+            print(f"Error refreshing event scores: {str(e)}")
+            delay = None
+        await asyncio.sleep(EVENT_SCORE_MAX_SLEEP if delay is None else min(delay, EVENT_SCORE_MAX_SLEEP))
+
+@app.on_event("startup")
+async def start_event_score_refresher():
+    app.state.event_score_refresher = asyncio.create_task(refresh_event_scores())
+
+@app.on_event("startup")
+def start_parallel_scorer():
+    # Opt-in: score very large catalogs on SCORING_PROCESSES worker processes
+    if SCORING_PROCESSES > 0:
+        recommendation.parallel_scorer = ParallelScorer(SCORING_PROCESSES)
+
+@app.on_event("shutdown")
+def shutdown_recommendation_pool():
+    for name in ("event_score_refresher", "asset_rescanner"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+    recommendation_executor.shutdown(wait=False, cancel_futures=True)
+    if recommendation.parallel_scorer is not None:
+        recommendation.parallel_scorer.close()
+        recommendation.parallel_scorer = None
+
+MONUMENT_FIELDS = list(Monument.model_fields)
+
+# Opt-in streaming format for large responses, and how many lines go out per chunk
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_CHUNK_LINES = int(os.getenv("NDJSON_CHUNK_LINES", "256"))
+
+# Seconds clients may reuse a /getMonuments response before revalidating it with If-None-Match
+MONUMENTS_MAX_AGE = int(os.getenv("MONUMENTS_MAX_AGE", "0"))
 
 assets_dir = Path("assets")
 assets_dir.mkdir(exist_ok=True)
@@ -43,10 +108,63 @@ assets_dir.mkdir(exist_ok=True)
 # Mount the static files directory
 app.mount("/assets", StaticFiles(directory=assets_dir), name="assets")
 
+# Path, size, mtime and hash of every file under assets_dir, so handlers never stat the disk
+asset_manifest = AssetManifest(assets_dir)
+# Catalog monuments without an image on disk, exposed in /metrics
+missing_images = MissingImages(asset_manifest)
+
+def rescan_assets_now():
+    """Rescan assets_dir and recount missing images; returns (files, missing images)"""
+    files = asset_manifest.refresh()
+    return files, missing_images.update(monument_catalog.get())
+
+async def rescan_assets_periodically():
+    while True:
+        await asyncio.sleep(ASSET_RESCAN_INTERVAL)
+        try:
+            await run_in_recommendation_pool(rescan_assets_now)
+        except Exception as e:
+            print(f"Error rescanning assets: {str(e)}")
+
+@app.on_event("startup")
+async def build_asset_manifest():
+    await run_in_recommendation_pool(asset_manifest.refresh)
+    try:
+        snapshot = await run_in_recommendation_pool(monument_catalog.get)
+        await run_in_recommendation_pool(missing_images.update, snapshot)
+    except Exception as e:
+        # Counted again by the next event score refresh or asset rescan
+        print(f"Error counting missing images: {str(e)}")
+    if ASSET_RESCAN_INTERVAL > 0:
+        app.state.asset_rescanner = asyncio.create_task(rescan_assets_periodically())
+
 class RecommendationRequest(BaseModel):
     latitude: Optional[float] = 27.7104
     longitude: Optional[float] = 85.3487
-    preferred_type: Optional[str] = "Hindu Temple" #Need to update here by fetching actual user preference from db
+    preferred_type: Optional[str] = "Hindu Temple" # Used when user_id is not given or the user has no preference tags
+    user_id: Optional[int] = None  # Personalize by the user's preference tags
+    radius_km: Optional[float] = Field(None, gt=0)  # Only score monuments within this distance
+    nearest: Optional[int] = Field(None, gt=0)  # Only score this many of the nearest monuments
+    limit: Optional[int] = Field(None, gt=0)  # Page size; all monuments when not set
+    offset: Optional[int] = Field(0, ge=0)
+    diversity: Optional[float] = Field(None, ge=0, le=1)  # Re-rank the top for variety of type and place
+
+class BatchRecommendationUser(BaseModel):
+    latitude: float
+    longitude: float
+    preferred_type: Optional[str] = "Hindu Temple"
+
+class BatchRecommendationRequest(BaseModel):
+    users: List[BatchRecommendationUser]
+    limit: Optional[int] = Field(10, gt=0)  # Monuments returned per user
+
+class ItineraryRequest(BaseModel):
+    latitude: Optional[float] = 27.7104
+    longitude: Optional[float] = 85.3487
+    preferred_type: Optional[str] = "Hindu Temple"
+    user_id: Optional[int] = None
+    time_budget_minutes: Optional[float] = Field(240, gt=0)  # Travel plus visits
+    max_stops: Optional[int] = Field(None, gt=0, le=ITINERARY_MAX_STOPS)
 
 
 # Initialize components
@@ -126,48 +244,186 @@ async def read_root():
 async def read_item():
     return {"message": "Hello World"}
 
+@app.get("/metrics")
+async def get_metrics():
+    """Metrics in the Prometheus text format, including per-stage recommendation timings"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.post("/rescanAssets")
+async def rescan_assets():
+    """Rescan the assets directory now instead of waiting for the periodic rescan"""
+    files, missing = await run_in_recommendation_pool(rescan_assets_now)
+    return {"files": files, "missing_images": missing, "scanned_at": asset_manifest.scanned_at}
+
+@app.post("/profiling")
+async def set_profiling(enabled: bool):
+    """
+    Switch per-stage timing on or off at runtime.
+    
+    While on, recommendation responses carry a Server-Timing header and the
+    stage timings are recorded in /metrics.
+    """
+    profiler.enabled = enabled
+    return {"enabled": profiler.enabled}
+
+def monument_model(row):
+    """Response model for a catalog row"""
+    # Convert to Pydantic model format
+    return Monument(
+        id=row['id'],
+        name=row['name'],
+        latitude=row['latitude'],
+        longitude=row['longitude'],
+        popularity=row['popularity'],
+        indoor=row['indoor'],
+        type=row['type'],
+        description=row['description'],
+        image_url=row['image_url'],
+        location = row['location']
+    )
+
+def wants_ndjson(request: Request):
+    """Whether the client asked for newline-delimited JSON"""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def ndjson_lines(items, to_json):
+    """
+    Newline-delimited JSON, one item per line.
+    
+    Lines are yielded in chunks of NDJSON_CHUNK_LINES, so only one chunk is
+    ever held in memory and the first one goes out right away.
+    """
+    lines = []
+    for item in items:
+        lines.append(to_json(item))
+        if len(lines) >= NDJSON_CHUNK_LINES:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+def monuments_etag(snapshot, *variant):
+    """Strong ETag for one representation of the catalog: its content version plus query and format"""
+    digest = hashlib.sha256(repr(variant).encode()).hexdigest()[:16]
+    return f'"{snapshot.version[:32]}-{digest}"'
+
+def etag_matches(request: Request, etag):
+    """Whether If-None-Match names etag (weak comparison, as RFC 9110 asks for)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+def parse_fields(fields):
+    """Monument fields named in a comma-separated fields= parameter; None means all of them"""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in MONUMENT_FIELDS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown fields {unknown}, expected a comma-separated subset of {MONUMENT_FIELDS}"
+        )
+    return list(dict.fromkeys(names))
+
 @app.get("/getMonuments", response_model=List[Monument])
-async def get_monuments(db: Session = Depends(get_db)):
+async def get_monuments(
+    request: Request,
+    response: Response,
+    after: Optional[int] = Query(None, description="Return monuments with ids greater than this cursor"),
+    limit: Optional[int] = Query(None, gt=0, description="Page size"),
+    fields: Optional[str] = Query(None, description="Comma-separated monument fields to return, e.g. id,name,latitude,longitude"),
+):
     """
     Get a list of all monuments with their details including image URLs from the database.
     
     The images can be accessed directly via their URLs, for example:
     http://localhost:8000/assets/Pashupatinath_Temple.jpg
+    
+    Parameters:
+    - after: Keyset cursor; only monuments with a larger id are returned, in id order (optional)
+    - limit: Return at most this many monuments, in id order (optional, default: all).
+      When more remain, a Link header with rel="next" points to the next page
+    - fields: Return only these fields of each monument (optional, default: all)
+    
+    With "Accept: application/x-ndjson" the monuments are streamed one JSON
+    object per line instead of as one array.
+    
+    Responses carry an ETag that changes with the catalog contents; sending it
+    back in If-None-Match gets a bodiless 304 while the catalog is unchanged.
     """
-    # Query monuments from database
-    db_monuments = db.query(DBMonument).all()
-    
-    # Convert DB models to Pydantic models
-    monuments = []
-    for db_monument in db_monuments:
-        # Check if image exists
-        if db_monument.image_url:
-            image_path = Path(db_monument.image_url.replace("/assets/", ""))
-            full_path = assets_dir / image_path
-            if not full_path.exists():
-                print(f"Warning: Image {db_monument.image_url} not found at {full_path}")
-        
-        # Get events as a list - adjust this based on your database schema
-        events = []
-        if hasattr(db_monument, 'monument_events'):  # Assuming a relationship
-            events = [event.name for event in db_monument.monument_events]
-        
-        # Convert to Pydantic model format
-        monument = Monument(
-            id=db_monument.monument_id,  # Adjust field name if different
-            name=db_monument.name,
-            latitude=db_monument.latitude,
-            longitude=db_monument.longitude,
-            popularity=db_monument.popularity,
-            indoor=db_monument.indoor,
-            type=db_monument.type,
-            description=db_monument.description,
-            image_url=db_monument.image_url,
-            location = db_monument.location
+    projection = parse_fields(fields)
+    ndjson = wants_ndjson(request)
+    
+    # Read monuments from the shared in-memory catalog snapshot
+    snapshot = await run_in_recommendation_pool(monument_catalog.get)
+    
+    # The version is hashed once per snapshot, off the event loop
+    etag = await run_in_recommendation_pool(monuments_etag, snapshot, after, limit, projection, ndjson)
+    cache_headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={MONUMENTS_MAX_AGE}, must-revalidate",
+        "Vary": "Accept",
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers)
+    response.headers.update(cache_headers)
+    
+    if after is None and limit is None:
+        rows = range(len(snapshot.monuments))
+    else:
+        rows = snapshot.rows_after(after, limit)
+        # A full page that does not reach the end of the catalog has a next page
+        if limit is not None and len(rows) == limit and rows[-1] != snapshot.id_order[-1]:
+            next_url = request.url.include_query_params(after=int(snapshot.store.ids[rows[-1]]))
+            response.headers["Link"] = f'<{next_url}>; rel="next"'
+    records = (snapshot.monuments[row] for row in rows)
+    
+    if projection is None:
+        to_json = lambda row: monument_model(row).model_dump_json()
+    else:
+        to_json = lambda row: json.dumps({name: row[name] for name in projection})
+    
+    if ndjson:
+        return StreamingResponse(
+            ndjson_lines(records, to_json), media_type=NDJSON_MEDIA_TYPE, headers=dict(response.headers)
         )
-        monuments.append(monument)
     
-    return monuments
+    # JSON bodies are serialized once per catalog generation and query, then served as raw bytes
+    key = (after, limit, None if projection is None else tuple(projection))
+    body = monuments_json_cache.get(key, snapshot.generation)
+    if body is None:
+        body = await run_in_recommendation_pool(monuments_json, list(records), projection)
+        monuments_json_cache.put(key, body, snapshot.generation)
+    return Response(body, media_type="application/json", headers=dict(response.headers))
+
+@app.get("/monuments/{monument_id}/nearby")
+async def get_nearby_monuments(monument_id: int, k: int = Query(10, gt=0, le=NEARBY_K)):
+    """
+    Get the monuments closest to a monument, nearest first.
+    
+    Served from the nearby graph precomputed with the catalog, so the cost
+    does not depend on the catalog size.
+    
+    Parameters:
+    - monument_id: The monument to look around
+    - k: Number of nearby monuments to return (optional, default: 10)
+    
+    Returns:
+    - A list of monument objects, each with its distance_km from the monument
+    """
+    snapshot = await run_in_recommendation_pool(monument_catalog.get)
+    row = snapshot.rows_by_id.get(monument_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Monument {monument_id} not found")
+    
+    rows, distances = snapshot.nearby_graph.nearby(row, k)
+    return [
+        dict(snapshot.monuments[neighbour], distance_km=float(distance))
+        for neighbour, distance in zip(rows, distances)
+    ]
 
 # @app.post("/recognizeMonument")
 # async def get_Monument(request: Optionl[Image] ):
@@ -180,7 +436,7 @@ async def get_monuments(db: Session = Depends(get_db)):
 
 
 @app.post("/getRecommendations")
-async def get_recommendations(request: Optional[RecommendationRequest] = Body(None)):
+async def get_recommendations(http_request: Request, request: Optional[RecommendationRequest] = Body(None)):
     """
     Get recommended monuments based on user preferences.
     
@@ -188,18 +444,95 @@ async def get_recommendations(request: Optional[RecommendationRequest] = Body(No
     - latitude: User's current latitude (optional, default: 27.7104)
     - longitude: User's current longitude (optional, default: 85.3487)
     - preferred_type: Type of monument the user prefers (optional, default: "Hindu Temple")
+    - user_id: Personalize using the user's preference tags (optional)
+    - radius_km: Only consider monuments within this many km (optional)
+    - nearest: Only consider this many of the nearest monuments (optional)
+    - limit: Return at most this many monuments (optional, default: all)
+    - offset: Skip this many of the best ranked monuments (optional, default: 0)
+    - diversity: 0 to 1, trade score for variety of type and location among
+      the top results (optional, default: off)
     
     Returns:
-    - A sorted list of monument objects based on recommendation score
+    - A sorted list of monument objects based on recommendation score; with
+      "Accept: application/x-ndjson", streamed one monument per line
     """
     if request is None:
         request = RecommendationRequest()
         
-    return recommend_monuments(
+    params = dict(
+        user_lat=request.latitude,
+        user_long=request.longitude,
+        preferred_type=request.preferred_type,
+        radius_km=request.radius_km,
+        nearest=request.nearest,
+        limit=request.limit,
+        offset=request.offset or 0,
+        user_id=request.user_id,
+        diversity=request.diversity
+    )
+    if wants_ndjson(http_request):
+        # Only the ranking is computed up front; records are built chunk by chunk as they stream
+        store, rows = await run_in_recommendation_pool(rank_monuments, **params)
+        return StreamingResponse(
+            ndjson_lines(iter_monument_records(store, rows), json.dumps), media_type=NDJSON_MEDIA_TYPE
+        )
+    results = await run_in_recommendation_pool(recommend_monuments, **params)
+    with stage("serialize"):
+        return JSONResponse(jsonable_encoder(results))
+
+@app.post("/getRecommendations/batch")
+async def get_recommendations_batch(request: BatchRecommendationRequest):
+    """
+    Get recommended monuments for many users in one call.
+    
+    All users are scored against the catalog in one vectorized pass, which is
+    much cheaper than one /getRecommendations call per user.
+    
+    Parameters:
+    - users: List of {latitude, longitude, preferred_type} objects
+    - limit: Number of monuments returned per user (optional, default: 10)
+    
+    Returns:
+    - One list of monument objects per user, in the same order as the request
+    """
+    return await run_in_recommendation_pool(
+        recommend_monuments_batch,
+        [(user.latitude, user.longitude, user.preferred_type) for user in request.users],
+        limit=request.limit or 10
+    )
+
+@app.post("/planItinerary")
+async def get_itinerary(request: Optional[ItineraryRequest] = Body(None)):
+    """
+    Plan a multi-stop route through recommended monuments.
+    
+    The best scored monuments that fit in the time budget are ordered into a
+    short route from the user's position (nearest neighbour + 2-opt).
+    
+    Parameters:
+    - latitude: User's current latitude (optional, default: 27.7104)
+    - longitude: User's current longitude (optional, default: 85.3487)
+    - preferred_type: Type of monument the user prefers (optional, default: "Hindu Temple")
+    - time_budget_minutes: Time available for travel and visits (optional, default: 240)
+    - max_stops: Plan at most this many stops (optional)
+    - user_id: Personalize using the user's preference tags (optional)
+    
+    Returns:
+    - The ordered stops with leg distances and arrival times, plus route totals
+    """
+    if request is None:
+        request = ItineraryRequest()
+    
+    return await run_in_recommendation_pool(
+        plan_itinerary,
         user_lat=request.latitude,
         user_long=request.longitude,
-        preferred_type=request.preferred_type
+        preferred_type=request.preferred_type,
+        time_budget_minutes=request.time_budget_minutes,
+        max_stops=request.max_stops,
+        user_id=request.user_id
     )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
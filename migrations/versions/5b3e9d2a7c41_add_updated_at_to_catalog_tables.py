@@ -0,0 +1,43 @@
+"""Add updated_at to catalog tables
+
+Revision ID: 5b3e9d2a7c41
+Revises: 830b0120cbb8
+Create Date: 2026-10-17 21:40:12.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql as mysql_types
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b3e9d2a7c41'
+down_revision: Union[str, None] = '830b0120cbb8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables read into the in-memory catalog; the catalog fingerprint reads max(updated_at) of each
+CATALOG_TABLES = ['monument', 'event', 'monument_event', 'monument_slot', 'day_slot', 'tag', 'monument_tag']
+
+
+def upgrade() -> None:
+    mysql = op.get_bind().dialect.name == 'mysql'
+    for table in CATALOG_TABLES:
+        if mysql:
+            # Microsecond precision, and kept current by MySQL itself so raw SQL edits are noticed too;
+            # the same CURRENT_TIMESTAMP(6) the models write, so every write uses the database clock
+            column = sa.Column('updated_at', mysql_types.DATETIME(fsp=6), nullable=False,
+                               server_default=sa.text('CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)'))
+        else:
+            column = sa.Column('updated_at', sa.DateTime(), nullable=False,
+                               server_default=sa.func.current_timestamp())
+        op.add_column(table, column)
+        op.create_index(f'ix_{table}_updated_at', table, ['updated_at'])
+
+
+def downgrade() -> None:
+    for table in reversed(CATALOG_TABLES):
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+        op.drop_column(table, 'updated_at')
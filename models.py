@@ -1,16 +1,56 @@
 from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Table
+from sqlalchemy.dialects import mysql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 Base = declarative_base()
 
+class updated_at_now(FunctionElement):
+    """
+    The database's current time, with sub-second precision where the dialect has it.
+
+    Every writer of updated_at uses this clock: ORM and Core writes through the
+    column default, and raw SQL on MySQL through the ON UPDATE the migration adds.
+    """
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(updated_at_now)
+def _updated_at_now(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+@compiles(updated_at_now, 'mysql')
+def _updated_at_now_mysql(element, compiler, **kw):
+    # Same expression as the column's ON UPDATE
+    return "CURRENT_TIMESTAMP(6)"
+
+@compiles(updated_at_now, 'sqlite')
+def _updated_at_now_sqlite(element, compiler, **kw):
+    # CURRENT_TIMESTAMP only has seconds on SQLite; this is the same UTC clock with milliseconds
+    return "STRFTIME('%Y-%m-%d %H:%M:%f', 'now')"
+
+def updated_at_column(name=None):
+    """
+    Last write time of a catalog row, set on insert and on every ORM or Core update.
+
+    The catalog fingerprint reads max(updated_at), so in-place edits made by any
+    process are noticed. The migration also has MySQL maintain it for raw SQL writes.
+    """
+    args = (name,) if name else ()
+    # Microseconds on MySQL, so edits within the same second still move the maximum
+    column_type = DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+    return Column(*args, column_type, nullable=False, default=updated_at_now(), onupdate=updated_at_now(), index=True)
+
 # Many-to-many relationship tables
 monument_tag = Table(
     'monument_tag',
     Base.metadata,
     Column('tag_id', Integer, ForeignKey('tag.tag_id'), primary_key=True),
-    Column('monument_id', Integer, ForeignKey('monument.monument_id'), primary_key=True)
+    Column('monument_id', Integer, ForeignKey('monument.monument_id'), primary_key=True),
+    updated_at_column('updated_at')
 )
 
 user_preference = Table(
@@ -25,6 +65,7 @@ class Tag(Base):
     
     tag_id = Column(Integer, primary_key=True, autoincrement=True)
     tag_name = Column(String(255), nullable=False, unique=True)
+    updated_at = updated_at_column()
     
     # Relationships
     monuments = relationship("Monument", secondary=monument_tag, back_populates="tags")
@@ -58,6 +99,7 @@ class Monument(Base):
     type = Column(String(255))
     description = Column(Text)
     image_url = Column(String(255))
+    updated_at = updated_at_column()
     
     # Relationships
     tags = relationship("Tag", secondary=monument_tag, back_populates="monuments")
@@ -72,6 +114,7 @@ class MonumentEvent(Base):
     monument_id = Column(Integer, ForeignKey('monument.monument_id'), primary_key=True)
     event_id = Column(Integer, ForeignKey('event.event_id'), primary_key=True)
     name = Column(String(255))
+    updated_at = updated_at_column()
     
     # Relationships
     monument = relationship("Monument", back_populates="monument_events")
@@ -85,6 +128,7 @@ class Event(Base):
     start_date = Column(DateTime, nullable=False)
     end_date = Column(DateTime, nullable=False)
     related_type = Column(String(255))
+    updated_at = updated_at_column()
     
     # Relationships
     monument_events = relationship("MonumentEvent", back_populates="event")
@@ -94,6 +138,7 @@ class MonumentSlot(Base):
     
     monument_id = Column(Integer, ForeignKey('monument.monument_id'), primary_key=True)
     slot_id = Column(Integer, ForeignKey('day_slot.slot_id'), primary_key=True)
+    updated_at = updated_at_column()
     
     # Relationships
     monument = relationship("Monument", back_populates="slots")
@@ -104,6 +149,7 @@ class DaySlot(Base):
     
     slot_id = Column(Integer, primary_key=True, autoincrement=True)
     slot_name = Column(String(255), nullable=False)
+    updated_at = updated_at_column()
     
     # Relationships
     monuments = relationship("MonumentSlot", back_populates="slot")
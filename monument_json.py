@@ -0,0 +1,38 @@
+# monument_json.py
+import os
+from typing import List
+import pydantic_core
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from cache import LRUCache
+
+# Serialized /getMonuments bodies kept for the current catalog, one per after/limit/fields combination
+MONUMENTS_JSON_CACHE_SIZE = int(os.getenv("MONUMENTS_JSON_CACHE_SIZE", "64"))
+
+class Monument(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    latitude: float
+    longitude: float
+    type: str
+    popularity: float
+    indoor: bool
+    description: str
+    image_url: str
+    location: str
+
+monument_list = TypeAdapter(List[Monument])
+monuments_json_cache = LRUCache(maxsize=MONUMENTS_JSON_CACHE_SIZE, name="monuments_json")
+
+def monuments_json(records, projection=None):
+    """
+    JSON array of catalog records as bytes, with every Monument field or only
+    those in projection.
+
+    Full records are validated and dumped in one pass by pydantic-core rather
+    than one model at a time.
+    """
+    if projection is None:
+        return monument_list.dump_json(monument_list.validate_python(records))
+    return pydantic_core.to_json([{name: row[name] for name in projection} for row in records])
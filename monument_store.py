@@ -0,0 +1,161 @@
+# monument_store.py
+import numpy as np
+
+# Monument type code for a missing type; user types not in the catalog get NO_MATCH_CODE
+MISSING_CODE = -1
+NO_MATCH_CODE = -2
+
+# best_time is coded into these fixed slots; anything else (or missing) is 'other'
+TIME_SLOTS = ['morning', 'afternoon', 'evening', 'other']
+OTHER_SLOT = TIME_SLOTS.index('other')
+
+def csr_take(indptr, indices, rows):
+    """Rows of a CSR incidence matrix, in the given order; returns (indptr, indices)"""
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    new_indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_indptr[1:])
+    # Positions of every selected row's slice, concatenated
+    flat = np.arange(new_indptr[-1]) - np.repeat(new_indptr[:-1] - starts, lengths)
+    return new_indptr, indices[flat]
+
+def csr_from_lists(rows, lookup):
+    """CSR incidence matrix from one list of labels per row; labels missing from lookup are skipped"""
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indices = []
+    for i, labels in enumerate(rows):
+        if labels:
+            indices.extend(sorted({lookup[label] for label in labels if label in lookup}))
+        indptr[i + 1] = len(indices)
+    return indptr, np.array(indices, dtype=np.int64)
+
+def encode(values):
+    """Integer-code a list of labels; returns (codes, categories). None is coded MISSING_CODE"""
+    categories = sorted({value for value in values if value is not None})
+    lookup = {name: code for code, name in enumerate(categories)}
+    codes = np.array([lookup.get(value, MISSING_CODE) for value in values], dtype=np.int32)
+    return codes, categories
+
+def encode_time_slots(values):
+    """Code best_time values into TIME_SLOTS positions"""
+    lookup = {name: code for code, name in enumerate(TIME_SLOTS)}
+    return np.array([lookup.get(value, OTHER_SLOT) for value in values], dtype=np.int8)
+
+class MonumentStore:
+    """
+    Columnar (struct-of-arrays) view of the monuments used by the scorer.
+
+    Numeric columns are float64 arrays, type is an integer code into
+    type_names, best_time a TIME_SLOTS position and indoor a boolean array. Tags form a
+    sparse monument x tag matrix in CSR form (tag_indptr / tag_indices). Text
+    fields only live in records, the response objects handed back to clients.
+    """
+
+    def __init__(self, ids, latitude, longitude, popularity, indoor,
+                 type_codes, type_names, best_time_codes,
+                 tag_indptr, tag_indices, tag_names, records):
+        self.ids = ids
+        self.latitude = latitude
+        self.longitude = longitude
+        self.popularity = popularity
+        self.indoor = indoor
+        self.type_codes = type_codes
+        self.type_names = type_names
+        self.best_time_codes = best_time_codes
+        self.tag_indptr = tag_indptr
+        self.tag_indices = tag_indices
+        self.tag_names = tag_names
+        self.records = records
+        self._type_lookup = {name: code for code, name in enumerate(type_names)}
+        self._tag_lookup = {name: code for code, name in enumerate(tag_names)}
+        # Row of every non-zero, so a mat-vec product is a single bincount
+        self._tag_rows = np.repeat(np.arange(len(ids)), np.diff(tag_indptr))
+        self._tag_counts = np.diff(tag_indptr)
+
+    @classmethod
+    def from_records(cls, monuments_data):
+        """Build a store from the monument dicts produced by catalog.load_catalog_data"""
+        type_codes, type_names = encode([m['type'] for m in monuments_data])
+        best_time_codes = encode_time_slots([m.get('best_time') for m in monuments_data])
+        tag_names = sorted({tag for m in monuments_data for tag in m.get('tags', [])})
+        tag_indptr, tag_indices = csr_from_lists(
+            [m.get('tags', []) for m in monuments_data],
+            {name: code for code, name in enumerate(tag_names)}
+        )
+        records = [
+            {
+                'id': int(m['id']),
+                'name': m['name'],
+                'latitude': float(m['latitude']),
+                'longitude': float(m['longitude']),
+                'type': m['type'],
+                'popularity': float(m['popularity']),
+                'indoor': bool(m['indoor']),
+                'description': m['description'],
+                'image_url': m['image_url'],
+                'location': m['location']
+            }
+            for m in monuments_data
+        ]
+        return cls(
+            ids=np.array([r['id'] for r in records], dtype=np.int64),
+            latitude=np.array([r['latitude'] for r in records], dtype=np.float64),
+            longitude=np.array([r['longitude'] for r in records], dtype=np.float64),
+            popularity=np.array([r['popularity'] for r in records], dtype=np.float64),
+            indoor=np.array([r['indoor'] for r in records], dtype=bool),
+            type_codes=type_codes,
+            type_names=type_names,
+            best_time_codes=best_time_codes,
+            tag_indptr=tag_indptr,
+            tag_indices=tag_indices,
+            tag_names=tag_names,
+            records=records,
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def type_code(self, types):
+        """Codes for user-supplied type names (scalar or array); unknown names never match"""
+        if np.ndim(types) == 0:
+            return np.int32(self._type_lookup.get(types, NO_MATCH_CODE))
+        return np.array([self._type_lookup.get(name, NO_MATCH_CODE) for name in types], dtype=np.int32)
+
+    def tag_affinity(self, tags):
+        """
+        Share of each monument's tags that are among the given tag names.
+
+        Computed as one sparse mat-vec product over the monument x tag matrix.
+        A monument tagged only with its type scores 1 or 0, like type_match.
+        """
+        tags = set(tags or ())
+        if not tags or len(self.tag_indices) == 0:
+            return np.zeros(len(self))
+
+        preferred = np.zeros(len(self.tag_names))
+        preferred[[self._tag_lookup[tag] for tag in tags if tag in self._tag_lookup]] = 1
+        overlap = np.bincount(self._tag_rows, weights=preferred[self.tag_indices], minlength=len(self))
+        # Monuments without tags divide 0 by 0 and score 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            affinity = overlap / self._tag_counts
+        return np.nan_to_num(affinity)
+
+    def take(self, rows):
+        """Store restricted to the given rows, in that order"""
+        rows = np.asarray(rows, dtype=np.int64)
+        tag_indptr, tag_indices = csr_take(self.tag_indptr, self.tag_indices, rows)
+        return MonumentStore(
+            ids=self.ids[rows],
+            latitude=self.latitude[rows],
+            longitude=self.longitude[rows],
+            popularity=self.popularity[rows],
+            indoor=self.indoor[rows],
+            type_codes=self.type_codes[rows],
+            type_names=self.type_names,
+            best_time_codes=self.best_time_codes[rows],
+            tag_indptr=tag_indptr,
+            tag_indices=tag_indices,
+            tag_names=self.tag_names,
+            records=[self.records[i] for i in rows],
+        )
@@ -0,0 +1,208 @@
+# parallel_scoring.py
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from distance import farthest_km, unit_vectors
+from event_index import EventIndex
+from monument_store import MonumentStore
+from recommendation import DISTANCE_METHOD, EventScoreVector, final_weight_sum, top_k
+
+# Worker processes for full-catalog scoring; 0 keeps all scoring in the request thread
+SCORING_PROCESSES = int(os.getenv("SCORING_PROCESSES", "0"))
+# Catalogs smaller than this are scored in-process even when the pool is running
+PARALLEL_MIN_MONUMENTS = int(os.getenv("PARALLEL_MIN_MONUMENTS", "200000"))
+
+def shared_columns(snapshot):
+    """The numeric arrays workers need, by name"""
+    store, events = snapshot.store, snapshot.event_index
+    return {
+        'ids': store.ids,
+        'latitude': store.latitude,
+        'longitude': store.longitude,
+        'units': unit_vectors(store.latitude, store.longitude),
+        'popularity': store.popularity,
+        'indoor': store.indoor,
+        'type_codes': store.type_codes,
+        'best_time_codes': store.best_time_codes,
+        'tag_indptr': store.tag_indptr,
+        'tag_indices': store.tag_indices,
+        'event_start_dates': events.start_dates,
+        'event_end_dates': events.end_dates,
+        'event_indptr': events.indptr,
+        'event_indices': events.indices,
+    }
+
+class SharedCatalog:
+    """
+    The numeric columns of one catalog snapshot, copied into a single shared
+    memory block so worker processes can map them without pickling.
+
+    spec is the small picklable description workers attach with.
+    """
+
+    def __init__(self, snapshot):
+        columns = {name: np.ascontiguousarray(array) for name, array in shared_columns(snapshot).items()}
+        layout = {}
+        size = 0
+        for name, array in columns.items():
+            size = (size + 63) // 64 * 64
+            layout[name] = (size, array.dtype.str, array.shape)
+            size += array.nbytes
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for name, array in columns.items():
+            column_view(self.shm, layout[name])[...] = array
+        self.generation = snapshot.generation
+        self.spec = {
+            'name': self.shm.name,
+            'generation': snapshot.generation,
+            'layout': layout,
+            'type_names': snapshot.store.type_names,
+            'tag_names': snapshot.store.tag_names,
+        }
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+def column_view(shm, entry):
+    offset, dtype, shape = entry
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+
+class _RangeSnapshot:
+    """Just enough of a CatalogSnapshot for EventScoreVector, over one monument range"""
+
+    def __init__(self, generation, event_index):
+        self.generation = generation
+        self.event_index = event_index
+
+# Worker side: shared block name -> (SharedMemory, columns, {(start, end): range state})
+_attached = {}
+
+def _attach(spec):
+    entry = _attached.get(spec['name'])
+    if entry is None:
+        # A new block means a new catalog; let go of the old ones
+        old = [shm for shm, _, _ in _attached.values()]
+        _attached.clear()
+        for shm in old:
+            try:
+                shm.close()
+            except BufferError:
+                pass
+        shm = shared_memory.SharedMemory(name=spec['name'])
+        columns = {name: column_view(shm, layout) for name, layout in spec['layout'].items()}
+        entry = _attached[spec['name']] = (shm, columns, {})
+    return entry
+
+def _range_state(spec, start, end):
+    """Store, event scores and unit vectors of monuments start:end, built once per worker"""
+    _, columns, ranges = _attach(spec)
+    state = ranges.get((start, end))
+    if state is None:
+        tag_lo, tag_hi = columns['tag_indptr'][start], columns['tag_indptr'][end]
+        store = MonumentStore(
+            ids=columns['ids'][start:end],
+            latitude=columns['latitude'][start:end],
+            longitude=columns['longitude'][start:end],
+            popularity=columns['popularity'][start:end],
+            indoor=columns['indoor'][start:end],
+            type_codes=columns['type_codes'][start:end],
+            type_names=spec['type_names'],
+            best_time_codes=columns['best_time_codes'][start:end],
+            tag_indptr=columns['tag_indptr'][start:end + 1] - tag_lo,
+            tag_indices=columns['tag_indices'][tag_lo:tag_hi],
+            tag_names=spec['tag_names'],
+            records=None,
+        )
+        event_lo, event_hi = columns['event_indptr'][start], columns['event_indptr'][end]
+        events = EventIndex(
+            columns['event_start_dates'],
+            columns['event_end_dates'],
+            columns['event_indptr'][start:end + 1] - event_lo,
+            columns['event_indices'][event_lo:event_hi],
+        )
+        state = ranges[(start, end)] = (
+            store, _RangeSnapshot(spec['generation'], events), EventScoreVector(), columns['units'][start:end]
+        )
+    return state
+
+def farthest_in_range(spec, start, end, lat, lon, method):
+    """Distance from (lat, lon) to the farthest monument in start:end"""
+    store, _, _, units = _range_state(spec, start, end)
+    return farthest_km(lat, lon, store.latitude, store.longitude, units=units, method=method)
+
+def score_range(spec, start, end, user, max_distance, k):
+    """Catalog rows and weights of the k best monuments in start:end, best first"""
+    store, snapshot, event_scores, _ = _range_state(spec, start, end)
+    date_scores = event_scores.get(snapshot, user['current_date'])
+    weights = final_weight_sum(user, store, date_scores=date_scores, max_distance=max_distance)
+    rows = top_k(weights, k)
+    return rows + start, weights[rows]
+
+class ParallelScorer:
+    """
+    Scores the whole catalog on a pool of worker processes.
+
+    The catalog's numeric columns live in shared memory and every worker
+    scores one contiguous range of monuments. A first round finds the
+    farthest monument (distances are normalized by it), a second returns each
+    range's top k, and the parent merges them. Results match the in-process
+    scorer, ties included.
+    """
+
+    def __init__(self, processes=SCORING_PROCESSES, min_monuments=PARALLEL_MIN_MONUMENTS):
+        self.processes = processes
+        self.min_monuments = min_monuments
+        self._pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+        self._shared = None
+        # Kept one generation longer for requests still scoring the previous catalog
+        self._retired = None
+        self._lock = threading.Lock()
+
+    def accepts(self, snapshot):
+        return len(snapshot.store) >= self.min_monuments
+
+    def _shared_for(self, snapshot):
+        with self._lock:
+            if self._shared is None or self._shared.generation != snapshot.generation:
+                if self._retired is not None:
+                    self._retired.close()
+                self._retired = self._shared
+                self._shared = SharedCatalog(snapshot)
+            return self._shared
+
+    def ranges(self, n):
+        bounds = np.linspace(0, n, self.processes + 1).astype(np.int64)
+        return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    def top_k(self, snapshot, user, k=None):
+        """
+        Catalog rows and weights of the k best monuments for one user (all when
+        k is None), best first, ranked as recommendation.top_k would rank them.
+        """
+        spec = self._shared_for(snapshot).spec
+        starts, ends = zip(*self.ranges(len(snapshot.store)))
+        n = len(starts)
+
+        max_distance = max(self._pool.map(
+            farthest_in_range, [spec] * n, starts, ends,
+            [user['latitude']] * n, [user['longitude']] * n, [DISTANCE_METHOD] * n
+        ))
+        parts = list(self._pool.map(score_range, [spec] * n, starts, ends, [user] * n, [max_distance] * n, [k] * n))
+
+        rows = np.concatenate([rows for rows, _ in parts])
+        weights = np.concatenate([weights for _, weights in parts])
+        order = np.lexsort((rows, -weights))[:k]
+        return rows[order], weights[order]
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            for shared in (self._shared, self._retired):
+                if shared is not None:
+                    shared.close()
+            self._shared = self._retired = None
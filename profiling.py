@@ -0,0 +1,118 @@
+# profiling.py
+import os
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from metrics import Histogram
+
+# Stage timing is off unless enabled here or at runtime through POST /profiling
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0").lower() in ("1", "true", "yes")
+
+stage_seconds = Histogram(
+    "recommendation_stage_seconds",
+    "Time spent in each stage of the recommendation pipeline",
+    labelnames=("stage",),
+)
+
+# (stage, seconds) pairs of the request being served; None outside a profiled request
+_request_timings = ContextVar("request_timings", default=None)
+
+class Profiler:
+    """Runtime switch for stage timing"""
+
+    def __init__(self, enabled=PROFILING_ENABLED):
+        self.enabled = enabled
+
+profiler = Profiler()
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        timings = _request_timings.get()
+        if timings is None:
+            stage_seconds.observe(elapsed, self.name)
+        else:
+            timings.append((self.name, elapsed))
+        return False
+
+def stage(name):
+    """
+    Time a block as one pipeline stage:
+
+        with stage("distance"):
+            ...
+
+    Inside a profiled request the time is reported in its Server-Timing
+    header; either way it ends up in the stage histogram. When profiling is
+    off this returns a shared no-op context manager.
+    """
+    if not profiler.enabled:
+        return _NULL_STAGE
+    return _Stage(name)
+
+def stage_totals(timings):
+    """Seconds per stage, summing stages that ran more than once, in first-run order"""
+    durations = defaultdict(float)
+    for name, seconds in timings:
+        durations[name] += seconds
+    return durations
+
+def server_timing(durations):
+    """Server-Timing header value for {stage: seconds}, in ms"""
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in durations.items())
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware collecting the stage timings of each HTTP request.
+
+    Requests that ran any stage get them, plus the time to the response
+    headers as "total", in a Server-Timing header, and they are recorded in
+    the stage histogram (summed per request). Passes requests straight
+    through when profiling is off.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        timings = []
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and timings:
+                durations = stage_totals(timings)
+                durations["total"] = time.perf_counter() - start
+                for name, seconds in durations.items():
+                    stage_seconds.observe(seconds, name)
+                message = dict(message, headers=list(message.get("headers", [])) + [
+                    (b"server-timing", server_timing(durations).encode("latin-1"))
+                ])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
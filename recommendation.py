@@ -1,248 +1,350 @@
 # recommendation.py
-from geopy.distance import geodesic 
+import os
+import json
 import numpy as np
-import pandas as pd
 from datetime import datetime
-from sqlalchemy.orm import Session
-from database import get_db
-from sqlalchemy import func
-import json
-from models import Monument, Event, MonumentEvent, DaySlot, MonumentSlot
+from cache import LRUCache
+from diversity import DIVERSITY_POOL, mmr_order, similarity
+from catalog import monument_catalog, get_user_preference_tags
+from distance import distances_km, farthest_km
+from monument_store import TIME_SLOTS
+from profiling import stage
+from spatial import DistanceMatrix, geohash
 
-def get_monuments_data(db: Session):
-    """
-    Fetch all monuments from the database with their related information
-    """
-    return db.query(Monument).all()
+# 'haversine' (default, fast) or 'ellipsoidal' (WGS-84, matches geopy's geodesic)
+DISTANCE_METHOD = os.getenv("DISTANCE_METHOD", "haversine")
+
+# Result cache for repeated queries from the same area; 0 disables it
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "0"))
+# Geohash precision used to quantize the user position (6 is about 1.2 x 0.6 km)
+RECOMMENDATION_CACHE_PRECISION = int(os.getenv("RECOMMENDATION_CACHE_PRECISION", "6"))
+
+recommendation_cache = LRUCache(maxsize=RECOMMENDATION_CACHE_SIZE, name="recommendation")
+
+# Monument-to-monument distances, shared by itinerary planning and diversity re-ranking
+distance_matrix = DistanceMatrix(method=DISTANCE_METHOD)
 
-def get_events_data(db: Session):
+# Optional multi-process scorer for very large catalogs (parallel_scoring.ParallelScorer);
+# main.py sets it up when SCORING_PROCESSES is set
+parallel_scorer = None
+
+# Upper bound on users x monuments cells scored at once by the batch path
+BATCH_MAX_CELLS = int(os.getenv("BATCH_MAX_CELLS", "4000000"))
+
+def norm_distance(curr_latitude, curr_longitude, store, method=None, max_distance=None):
     """
-    Fetch all events from the database
+    Calculate normalized distance from current location to monuments.
+
+    Given arrays of user coordinates, returns one row per user. Distances are
+    normalized by the farthest monument in store unless max_distance is given
+    (used when store is only part of the catalog).
     """
-    return db.query(Event).all()
-
-def monument_to_dict(monument):
-    """Convert monument object to dictionary"""
-    return {
-        'id': monument.monument_id,
-        'name': monument.name,
-        'latitude': monument.latitude,
-        'longitude': monument.longitude,
-        'type': monument.type,
-        'popularity': monument.popularity,
-        'indoor': monument.indoor,
-        'description': monument.description,
-        'image_url': monument.image_url,
-        'location': monument.location
-    }
+    curr_latitude = np.asarray(curr_latitude, dtype=np.float64)
+    curr_longitude = np.asarray(curr_longitude, dtype=np.float64)
+    if len(store) == 0:
+        return np.zeros(curr_latitude.shape + (0,))
+
+    distance = distances_km(
+        curr_latitude[..., None],
+        curr_longitude[..., None],
+        store.latitude,
+        store.longitude,
+        method=method or DISTANCE_METHOD,
+    )
+    if max_distance is None:
+        max_distance = distance.max(axis=-1, keepdims=True)
+    
+    # Handle edge case where all monuments are at the same location
+    with np.errstate(invalid='ignore', divide='ignore'):
+        normalized_distance = np.where(max_distance == 0, 1.0, 1 - distance/max_distance)
+    return normalized_distance
+
+def type_match(type_of_monument, store):
+    """Score monuments based on matching monument type (one row per user for arrays)"""
+    type_match_hotcoded = store.type_code(type_of_monument)[..., None] == store.type_codes
+    return type_match_hotcoded.astype(int)
+
+# timedelta.days floors, so "starts within 7 days" means less than 8 days away
+EVENT_LEAD_NEAR = np.timedelta64(8, 'D')
+EVENT_LEAD_FAR = np.timedelta64(15, 'D')
 
-def get_monument_events(monument):
+def event_scores(current_date, start_dates, end_dates):
     """
-    Get event names associated with a monument using the relationship
+    Score events based on how close or current they are, for every event at once.
+
+    An event scores 1 while it is running, 0.5 when it starts within 7 days,
+    0.2 within 14 days and 0 otherwise (including when a date is missing).
     """
-    if hasattr(monument, 'monument_events') and monument.monument_events:
-        return [me.event.name for me in monument.monument_events]
-    return []
+    now = np.datetime64(current_date, 'us')
+    lead = start_dates - now
+    has_dates = ~np.isnat(start_dates) & ~np.isnat(end_dates)
 
-def get_monument_best_time(monument, db: Session):
+    scores = np.zeros(len(start_dates))
+    upcoming = has_dates & (now < start_dates)
+    scores[upcoming & (lead < EVENT_LEAD_FAR)] = 0.2
+    scores[upcoming & (lead < EVENT_LEAD_NEAR)] = 0.5
+    scores[has_dates & (now >= start_dates) & (now <= end_dates)] = 1
+    return scores
+        
+def calculate_date_score(current_date, event_index):
+    """Calculate score for monuments based on upcoming or current events"""
+    date_scores = np.zeros(event_index.n_monuments)
+    if len(event_index.indices) == 0:
+        return date_scores
+
+    per_event = event_scores(current_date, event_index.start_dates, event_index.end_dates)
+    pair_scores = per_event[event_index.indices]
+
+    # Max over each monument's slice of the incidence matrix; monuments without events stay 0
+    starts = event_index.indptr[:-1]
+    has_events = event_index.indptr[1:] > starts
+    date_scores[has_events] = np.maximum.reduceat(pair_scores, starts[has_events])
+
+    return date_scores
+
+def next_event_score_change(current_date, event_index):
     """
-    Get the best time to visit a monument based on its slots
+    First instant after current_date at which any monument's event score can
+    change, or None if none ever will.
+
+    Scores only move when the clock crosses an event's 14 or 7 day lead
+    boundary, its start, or the end of its end date.
     """
-    if hasattr(monument, 'slots') and monument.slots:
-        slot_names = [slot.slot.slot_name for slot in monument.slots]
-        # Find the most common time slot
-        if slot_names:
-            # print(max(set(slot_names), key=slot_names.count))
-            return max(set(slot_names), key=slot_names.count)
-    return None  # Default if no slots defined
-
-def create_dataframes(db: Session):
+    linked = np.unique(event_index.indices)
+    start_dates = event_index.start_dates[linked]
+    end_dates = event_index.end_dates[linked]
+    has_dates = ~np.isnat(start_dates) & ~np.isnat(end_dates)
+    start_dates, end_dates = start_dates[has_dates], end_dates[has_dates]
+
+    # The lead and end rules are strict comparisons, so they flip one tick later
+    tick = np.timedelta64(1, 'us')
+    boundaries = np.concatenate([
+        start_dates - EVENT_LEAD_FAR + tick,
+        start_dates - EVENT_LEAD_NEAR + tick,
+        start_dates,
+        end_dates + tick,
+    ])
+    later = boundaries[boundaries > np.datetime64(current_date, 'us')]
+    if len(later) == 0:
+        return None
+    return later.min().astype(datetime)
+
+class EventScoreVector:
     """
-    Create DataFrames from database data for compatibility with existing code
+    Per-monument event scores for the current catalog snapshot.
+
+    Event scores are piecewise constant in time, so the vector is computed once
+    and reused until the next score boundary or until the catalog is rebuilt.
+    Requests just read the array; main.py refreshes it in the background.
     """
-    monuments = get_monuments_data(db)
-    events = get_events_data(db)
-    
-    # Process monument data
-    monuments_data = []
-    for monument in monuments:
-        monument_dict = monument_to_dict(monument)
-        
-        # Add events
-        monument_dict['events'] = get_monument_events(monument)
-        
-        # Add best time if available from day slots
-        best_time = get_monument_best_time(monument, db)
-        if best_time:
-            monument_dict['best_time'] = best_time
-        else:
-            # Default based on type if no slot info
-            if monument.type in ['Hindu Temple', 'Buddhist Stupa']:
-                monument_dict['best_time'] = 'morning'
-            elif monument.type in ['Museum', 'Historical Monument']:
-                monument_dict['best_time'] = 'afternoon'
-            else:
-                monument_dict['best_time'] = 'afternoon'
-        
-        # Determine best season (simplified - could be expanded based on your needs)
-        monument_dict['best_season'] = 'all'
-        
-        monuments_data.append(monument_dict)
-    
-    # Create DataFrames
-    df = pd.DataFrame(monuments_data)
-    
-    # Process event data
-    events_data = []
-    for event in events:
-        event_dict = {
-            'name': event.name,
-            'start_date': event.start_date.strftime('%Y-%m-%d') if event.start_date else None,
-            'end_date': event.end_date.strftime('%Y-%m-%d') if event.end_date else None,
-            'related_type': event.related_type
-        }
-        events_data.append(event_dict)
-    
-    df_events = pd.DataFrame(events_data)
-    
-    return df, df_events
 
-def norm_distance(curr_latitude, curr_longitude, df):
-    """Calculate normalized distance from current location to monuments"""
-    curr_point = (curr_latitude, curr_longitude)
-    distance = np.zeros(len(df))
-    max_distance = -1
-    
-    for i in range(len(df)):
-        point = (df['latitude'].iloc[i], df['longitude'].iloc[i])
-        distance[i] = geodesic(curr_point, point).km
+    def __init__(self):
+        # (catalog generation, computed_at, valid_until, scores), swapped atomically
+        self._state = None
 
-        if max_distance < distance[i]:
-            max_distance = distance[i]
-    
-    # Handle edge case where all monuments are at the same location
-    if max_distance == 0:
-        return np.ones(len(df))
-        
-    normalized_distance = (1 - distance/max_distance)
-    return normalized_distance
+    def _is_current(self, state, snapshot, current_date):
+        return (
+            state is not None
+            and state[0] == snapshot.generation
+            and state[1] <= current_date
+            and (state[2] is None or current_date < state[2])
+        )
 
-def type_match(type_of_monument, df):
-    """Score monuments based on matching monument type"""
-    type_match_hotcoded = (type_of_monument == df['type']).astype(int)
-    return np.array(type_match_hotcoded)
+    def get(self, snapshot, current_date=None):
+        """Scores for every monument in snapshot, refreshed first if stale"""
+        current_date = current_date or datetime.now()
+        state = self._state
+        if not self._is_current(state, snapshot, current_date):
+            state = self.refresh(snapshot, current_date)
+        return state[3]
 
-def single_event_score(event, current_date):
-    """Score an event based on how close or current it is"""
-    if not event.empty:
-        s_d = event['start_date'].iloc[0]
-        e_d = event['end_date'].iloc[0]
-        
-        if s_d and e_d:  # Check if dates are not None
-            try:
-                start_date = datetime.strptime(s_d, "%Y-%m-%d")
-                end_date = datetime.strptime(e_d, "%Y-%m-%d")
-
-                if current_date >= start_date and current_date <= end_date:
-                    return 1
-                elif current_date < start_date:
-                    if abs((current_date - start_date)).days <= 7:
-                        return 0.5
-                    if abs((current_date - start_date)).days <= 14:
-                        return 0.2
-                    return 0
-                else:
-                    return 0
-            except (ValueError, TypeError):
-                return 0
-    return 0
-        
-def calculate_date_score(current_date, df, df_events):
-    """Calculate score for monuments based on upcoming or current events"""
-    date_scores = np.zeros(len(df))
+    def refresh(self, snapshot, current_date=None):
+        current_date = current_date or datetime.now()
+        scores = calculate_date_score(current_date, snapshot.event_index)
+        scores.flags.writeable = False
+        state = (
+            snapshot.generation,
+            current_date,
+            next_event_score_change(current_date, snapshot.event_index),
+            scores,
+        )
+        self._state = state
+        return state
 
-    for i in range(len(df)):
-        max_score = 0
-        events = df['events'].iloc[i]
-        
-        if events and isinstance(events, list):  # Check if events list is not empty
-            for event in events:
-                event_data = df_events[df_events['name'] == event]
-                if not event_data.empty:
-                    score = single_event_score(event_data, current_date)
-                    if score > max_score:
-                        max_score = score
-                
-            date_scores[i] = max_score
+    def seconds_until_refresh(self, current_date=None):
+        """Seconds until the current vector expires; None if it never does or nothing is computed"""
+        state = self._state
+        if state is None or state[2] is None:
+            return None
+        current_date = current_date or datetime.now()
+        return max(0.0, (state[2] - current_date).total_seconds())
 
-    return date_scores
+event_score_vector = EventScoreVector()
 
-def scores_time_of_day(current_hour, df):
-    """Score monuments based on recommended visiting time"""
-    # If best_time column doesn't exist, return zeros
-    if 'best_time' not in df.columns:
-        return np.zeros(len(df))
-    
-    # Initialize scores
-    time_scores = np.zeros(len(df))
-    
+MORNING, AFTERNOON, EVENING = 0, 1, 2
+HOUR_BUCKETS = ['morning', 'afternoon', 'evening']
+
+# Score of each best_time slot (columns) during each part of the day (rows).
+# Override entries with TIME_OF_DAY_SCORES, e.g. '{"evening": {"afternoon": 0.6}}'
+DEFAULT_TIME_OF_DAY_SCORES = {
+    'morning': {'morning': 1.0, 'afternoon': 0.5, 'evening': 0.2, 'other': 0.2},
+    'afternoon': {'morning': 0.5, 'afternoon': 1.0, 'evening': 0.5, 'other': 0.2},
+    'evening': {'morning': 0.3, 'afternoon': 0.7, 'evening': 1.0, 'other': 0.3},
+}
+
+def load_time_of_day_table(overrides=None):
+    """(hour bucket x TIME_SLOTS) score table, with optional overrides applied"""
+    table = np.array([
+        [DEFAULT_TIME_OF_DAY_SCORES[bucket][slot] for slot in TIME_SLOTS]
+        for bucket in HOUR_BUCKETS
+    ])
+    for bucket, slots in (overrides or {}).items():
+        if bucket not in HOUR_BUCKETS:
+            raise ValueError(f"Unknown hour bucket '{bucket}' in time of day scores, expected one of {HOUR_BUCKETS}")
+        for slot, score in slots.items():
+            if slot not in TIME_SLOTS:
+                raise ValueError(f"Unknown time slot '{slot}' in time of day scores, expected one of {TIME_SLOTS}")
+            table[HOUR_BUCKETS.index(bucket), TIME_SLOTS.index(slot)] = float(score)
+    return table
+
+time_of_day_table = load_time_of_day_table(json.loads(os.getenv("TIME_OF_DAY_SCORES", "{}")))
+
+def hour_bucket(current_hour):
+    """Part of the day an hour falls in: MORNING, AFTERNOON or EVENING"""
     # Morning: 6-12, Afternoon: 12-17, Evening: 17-21
     if 6 <= current_hour < 12:
-        # Morning hours - higher score for morning attractions
-        for i in range(len(df)):
-            if df['best_time'].iloc[i] == 'morning':
-                time_scores[i] = 1.0
-            elif df['best_time'].iloc[i] == 'afternoon':
-                time_scores[i] = 0.5
-            else:
-                time_scores[i] = 0.2
+        return MORNING
     elif 12 <= current_hour < 17:
-        # Afternoon hours - higher score for afternoon attractions
-        for i in range(len(df)):
-            if df['best_time'].iloc[i] == 'afternoon':
-                time_scores[i] = 1.0
-            elif df['best_time'].iloc[i] in ['morning', 'evening']:
-                time_scores[i] = 0.5
-            else:
-                time_scores[i] = 0.2
-    else:
-        # Evening hours - higher score for evening attractions
-        for i in range(len(df)):
-            if df['best_time'].iloc[i] == 'evening':
-                time_scores[i] = 1.0
-            elif df['best_time'].iloc[i] == 'afternoon':
-                time_scores[i] = 0.7
-            else:
-                time_scores[i] = 0.3
-
-    return time_scores
-
-def final_weight_sum(user, df, df_events):
-    """Calculate final recommendation weights for all monuments"""
+        return AFTERNOON
+    return EVENING
+
+def scores_time_of_day(current_hour, store):
+    """Score monuments based on recommended visiting time"""
+    return time_of_day_table[hour_bucket(current_hour)][store.best_time_codes]
+
+def final_weight_sum(user, store, event_index=None, date_scores=None, max_distance=None):
+    """
+    Calculate final recommendation weights for all monuments.
+
+    Event scores come from date_scores when given (see EventScoreVector),
+    otherwise they are computed from event_index. max_distance is passed on
+    to norm_distance.
+
+    user['latitude'], user['longitude'] and user['likes'] may also be arrays,
+    in which case the result is a users x monuments matrix. When user['tags']
+    holds the user's preference tags, tag affinity replaces the type match.
+    """
     # Calculate individual factors
-    distance = norm_distance(user['latitude'], user['longitude'], df)
-    type_matched = type_match(user['likes'], df)
-    popularity = np.array(df['popularity'])
-    seasonal_event = calculate_date_score(datetime.now(), df, df_events)
-    time_of_day = scores_time_of_day(datetime.now().hour, df)
+    with stage("distance"):
+        distance = norm_distance(user['latitude'], user['longitude'], store, max_distance=max_distance)
+    with stage("preference"):
+        if user.get('tags'):
+            type_matched = store.tag_affinity(user['tags'])
+        else:
+            type_matched = type_match(user['likes'], store)
+    popularity = store.popularity
+    if date_scores is None:
+        with stage("event_scores"):
+            date_scores = calculate_date_score(datetime.now(), event_index)
+    seasonal_event = date_scores
+    with stage("time_of_day"):
+        time_of_day = scores_time_of_day(datetime.now().hour, store)
 
     # Combine factors with weights
-    total = 0.4 * distance + 0.2 * type_matched + 0.15 * popularity + 0.2 * seasonal_event + 0.05 * time_of_day
+    with stage("combine"):
+        total = 0.4 * distance + 0.2 * type_matched + 0.15 * popularity + 0.2 * seasonal_event + 0.05 * time_of_day
 
     return total
 
-def recommend_monuments(user_lat=27.7104, user_long=85.3487, preferred_type="Hindu Temple"):
+def catalog_max_distance(snapshot, lat, lon):
+    """
+    Distance in km from (lat, lon) to the farthest monument in the whole catalog.
+
+    Scoring only part of the catalog must normalize distances by this, not by
+    the farthest of that part, or the scores change with the pruning.
+    """
+    store = snapshot.store
+    return farthest_km(lat, lon, store.latitude, store.longitude, units=snapshot.units, method=DISTANCE_METHOD)
+
+def monument_records(store, rows):
+    """Response objects for the given store rows, in that order"""
+    return [dict(store.records[i]) for i in rows]
+
+def iter_monument_records(store, rows):
+    """Like monument_records, one at a time, so a long ranking never has to be held in memory"""
+    for i in rows:
+        yield dict(store.records[i])
+
+def top_k(weights, k, offset=0):
+    """
+    Row indices of the k best weights after skipping the first offset, best first.
+
+    Only the top offset + k rows are sorted; argpartition finds the cut-off
+    weight in linear time. Every row tied with it is kept before sorting, so
+    ties keep catalog order, as the previous full sort did, and pages neither
+    repeat nor skip tied monuments.
+    """
+    n = len(weights)
+    end = n if k is None else min(offset + k, n)
+    if end <= offset:
+        return np.array([], dtype=np.int64)
+    if end < n:
+        cutoff = weights[np.argpartition(-weights, end - 1)[end - 1]]
+        candidates = np.flatnonzero(weights >= cutoff)
+    else:
+        candidates = np.arange(n)
+    order = candidates[np.lexsort((candidates, -weights[candidates]))]
+    return order[offset:end]
+
+def load_user_tags(user_id):
+    """Preference tag names of a user; empty when the user has none"""
+    db = monument_catalog.session_factory()
+    try:
+        return get_user_preference_tags(db, user_id)
+    finally:
+        db.close()
+
+def recommend_monuments(user_lat=27.7104, user_long=85.3487, preferred_type="Hindu Temple",
+                        radius_km=None, nearest=None, limit=None, offset=0, user_id=None,
+                        diversity=None):
     """
     Main function to recommend monuments based on user preferences.
     Returns a sorted list of monument objects.
     
+    Takes the same parameters as rank_monuments.
+    """
+    store, rows = rank_monuments(user_lat, user_long, preferred_type, radius_km=radius_km, nearest=nearest,
+                                 limit=limit, offset=offset, user_id=user_id, diversity=diversity)
+    with stage("records"):
+        return monument_records(store, rows)
+
+# Returned by rank_monuments when there is nothing to recommend
+NO_ROWS = np.empty(0, dtype=np.int64)
+
+def rank_monuments(user_lat=27.7104, user_long=85.3487, preferred_type="Hindu Temple",
+                   radius_km=None, nearest=None, limit=None, offset=0, user_id=None,
+                   diversity=None):
+    """
+    Rank monuments for a user without building any response objects.
+    Returns (store, rows): the catalog store and the rows of the recommended
+    monuments in it, best first, so callers can build records lazily.
+    
     Parameters:
     - user_lat: float - user's latitude
     - user_long: float - user's longitude
     - preferred_type: str - type of monument the user prefers
+    - radius_km: float - only consider monuments within this distance (optional)
+    - nearest: int - only consider this many of the nearest monuments (optional)
+    - limit: int - return at most this many monuments (optional, default: all)
+    - offset: int - skip this many of the best ranked monuments (default: 0)
+    - user_id: int - personalize by the user's preference tags (optional; falls
+      back to preferred_type when the user has no tags)
+    - diversity: float - 0 to 1; re-rank the best DIVERSITY_POOL monuments
+      with maximal marginal relevance so the top of the list is not all one
+      type in one place (optional, default: off)
     
     Returns:
-    - List of monument objects sorted by recommendation score
+    - (store, rows) with rows sorted by recommendation score
     """
     # User preferences
     user = {
@@ -253,48 +355,153 @@ def recommend_monuments(user_lat=27.7104, user_long=85.3487, preferred_type="Hin
         'current_date': datetime.now()
     }
     
-    # Get database session
-    db = next(get_db())
-    
     try:
-        # Create dataframes from database data
-        df, df_events = create_dataframes(db)
+        # Shared in-memory snapshot of the catalog; only rebuilt when the tables change
+        with stage("catalog"):
+            snapshot = monument_catalog.get()
+        store = snapshot.store
+        
+        # Check if the catalog is empty
+        if len(store) == 0:
+            return store, NO_ROWS
         
-        # Check if dataframes are empty
-        if df.empty:
-            return []
+        # Personalized requests score by tag affinity instead of preferred_type
+        if user_id is not None:
+            with stage("user_tags"):
+                user['tags'] = sorted(load_user_tags(user_id))
         
-        # Calculate weights and recommendations
-        final_weights = final_weight_sum(user, df, df_events)
+        # Nearby users asking the same thing in the same part of the same day share results
+        cache_key = None
+        if recommendation_cache.enabled:
+            cache_key = (
+                geohash(user_lat, user_long, RECOMMENDATION_CACHE_PRECISION),
+                preferred_type,
+                tuple(user.get('tags') or ()),
+                hour_bucket(user['current_time']),
+                user['current_date'].date(),
+                radius_km, nearest, limit, offset, diversity
+            )
+            with stage("cache"):
+                cached = recommendation_cache.get(cache_key, snapshot.generation)
+            if cached is not None:
+                return snapshot.store, cached
         
-        # Create a list of monuments with their weights
-        monuments_with_weights = []
-        for i in range(len(df)):
-            monument = {
-                'id': int(df['id'].iloc[i]),
-                'name': df['name'].iloc[i],
-                'latitude': float(df['latitude'].iloc[i]),
-                'longitude': float(df['longitude'].iloc[i]),
-                'type': df['type'].iloc[i],
-                'popularity': float(df['popularity'].iloc[i]),
-                'indoor': bool(df['indoor'].iloc[i]),
-                'description': df['description'].iloc[i],
-                'image_url': df['image_url'].iloc[i],
-                'location': df['location'].iloc[i],
-                'weight': float(final_weights[i])  # Add the calculated weight
-            }
-            monuments_with_weights.append(monument)
+        # Rank deep enough for the requested page and, with diversity on, the re-ranking pool
+        end = None if limit is None else offset + limit
+        pool = max(DIVERSITY_POOL, end or 0) if diversity else 0
+        depth = None if end is None else max(end, pool)
         
-        # Sort monuments by weight in descending order
-        sorted_monuments = sorted(monuments_with_weights, key=lambda x: x['weight'], reverse=True)
+        candidates = None
+        if parallel_scorer is not None and radius_km is None and nearest is None and parallel_scorer.accepts(snapshot):
+            # Very large catalogs are scored range by range on worker processes
+            with stage("parallel_score"):
+                rows, weights = parallel_scorer.top_k(snapshot, user, depth)
+        else:
+            # Precomputed event scores; only recomputed when an event boundary is crossed
+            with stage("event_scores"):
+                date_scores = event_score_vector.get(snapshot, user['current_date'])
+            
+            # Prune to nearby candidates with the spatial index before scoring anything
+            max_distance = None
+            if radius_km is not None or nearest is not None:
+                with stage("spatial"):
+                    candidates, _ = snapshot.spatial_index.nearby(user_lat, user_long, radius_km=radius_km, k=nearest)
+                    # Catalog order, so ties rank as they would without pruning
+                    candidates = np.sort(candidates)
+                    store = store.take(candidates)
+                    date_scores = date_scores[candidates]
+                if len(store) == 0:
+                    return snapshot.store, NO_ROWS
+                # Pruning drops candidates but must not change their scores
+                with stage("distance"):
+                    max_distance = catalog_max_distance(snapshot, user_lat, user_long)
+            
+            # Calculate weights and recommendations
+            final_weights = final_weight_sum(user, store, date_scores=date_scores, max_distance=max_distance)
+            
+            # Only the best depth rows are sorted
+            with stage("rank"):
+                rows = top_k(final_weights, depth)
+                weights = final_weights[rows]
         
-        # Remove the weight field from the final response
-        for monument in sorted_monuments:
-            del monument['weight']
+        if pool:
+            with stage("diversity"):
+                catalog_rows = rows[:pool] if candidates is None else candidates[rows[:pool]]
+                similarities = similarity(
+                    snapshot.store.type_codes[catalog_rows],
+                    distance_matrix.between(snapshot, catalog_rows)
+                )
+                order = mmr_order(weights[:pool], similarities, diversity)
+                rows = np.concatenate([rows[:pool][order], rows[pool:]])
+        rows = rows[offset:end]
+        if candidates is not None:
+            rows = candidates[rows]
         
-        return sorted_monuments
+        if cache_key is not None:
+            # Shared by every request that hits this entry
+            rows.flags.writeable = False
+            recommendation_cache.put(cache_key, rows, snapshot.generation)
+        return snapshot.store, rows
     except Exception as e:
         print(f"Error in recommendation: {str(e)}")
-        return []
-    finally:
-        db.close()
\ No newline at end of file
+        return None, NO_ROWS
+
+def top_k_rows(weights, k):
+    """Column indices of the k best weights in each row, best first; ties keep catalog order, as in top_k"""
+    k = min(k, weights.shape[1])
+    if k == 0:
+        return np.zeros((weights.shape[0], 0), dtype=np.int64)
+    if k < weights.shape[1]:
+        cutoff = np.take_along_axis(weights, np.argpartition(-weights, k - 1, axis=1)[:, k - 1:k], axis=1)
+        above = weights > cutoff
+        # Fill each row up to k with its first columns tied at the cut-off
+        tied = weights == cutoff
+        tied &= np.cumsum(tied, axis=1) <= k - above.sum(axis=1, keepdims=True)
+        candidates = np.nonzero(above | tied)[1].reshape(weights.shape[0], k)
+    else:
+        candidates = np.broadcast_to(np.arange(k), weights.shape)
+    order = np.argsort(-np.take_along_axis(weights, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
+
+def recommend_monuments_batch(users, limit=10):
+    """
+    Recommend monuments for many users at once.
+
+    Parameters:
+    - users: list of (latitude, longitude, preferred_type) tuples
+    - limit: int - number of monuments to return per user
+
+    Returns:
+    - One list of monument objects per user, in the same order as users
+    """
+    with stage("catalog"):
+        snapshot = monument_catalog.get()
+    store = snapshot.store
+    if len(store) == 0 or not users:
+        return [[] for _ in users]
+
+    lats, longs, likes = (np.asarray(column) for column in zip(*users))
+    now = datetime.now()
+    date_scores = event_score_vector.get(snapshot, now)
+    results = []
+
+    # Score users in chunks so the users x monuments matrix stays bounded
+    chunk = max(1, BATCH_MAX_CELLS // len(store))
+    for start in range(0, len(users), chunk):
+        end = start + chunk
+        user = {
+            'latitude': lats[start:end],
+            'longitude': longs[start:end],
+            'likes': likes[start:end],
+            'current_time': now.hour,
+            'current_date': now
+        }
+        weights = final_weight_sum(user, store, date_scores=date_scores)
+
+        with stage("rank"):
+            best = top_k_rows(weights, limit)
+        with stage("records"):
+            for rows in best:
+                results.append(monument_records(store, rows))
+
+    return results
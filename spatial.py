@@ -0,0 +1,330 @@
+# spatial.py
+import os
+import threading
+import numpy as np
+from distance import EARTH_RADIUS_KM, haversine_km, pairwise_km
+
+# Grid cell size in degrees (0.1 deg is roughly 11 km north-south)
+SPATIAL_CELL_DEG = float(os.getenv("SPATIAL_CELL_DEG", "0.1"))
+
+# Catalogs up to this size keep a full monument x monument distance matrix
+DISTANCE_MATRIX_MAX_MONUMENTS = int(os.getenv("DISTANCE_MATRIX_MAX_MONUMENTS", "2000"))
+
+KM_PER_DEG_LAT = np.pi * EARTH_RADIUS_KM / 180
+
+class SpatialIndex:
+    """
+    Uniform latitude/longitude grid over monument coordinates.
+
+    Points are sorted by cell key, so the points of a row of neighbouring
+    cells are one contiguous slice found with searchsorted. Queries only
+    compute exact distances for points in the cells covering the search circle.
+    """
+
+    def __init__(self, lats, lons, cell_deg=SPATIAL_CELL_DEG):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.cell_deg = cell_deg
+        self.n_rows = int(np.ceil(180 / cell_deg))
+        self.n_cols = int(np.ceil(360 / cell_deg))
+
+        keys = self._row(self.lats) * self.n_cols + self._col(self.lons)
+        self.order = np.argsort(keys, kind='stable')
+        self.sorted_keys = keys[self.order]
+
+    def __len__(self):
+        return len(self.lats)
+
+    def _row(self, lat):
+        return np.clip(((np.asarray(lat) + 90) // self.cell_deg).astype(np.int64), 0, self.n_rows - 1)
+
+    def _col(self, lon):
+        return ((np.asarray(lon) + 180) // self.cell_deg).astype(np.int64) % self.n_cols
+
+    def _box(self, lat, lon, radius_km):
+        """Indices of all points in the cells covering a circle of radius_km"""
+        dlat = radius_km / KM_PER_DEG_LAT
+        row_lo, row_hi = self._row(lat - dlat), self._row(lat + dlat)
+        rows = np.arange(row_lo, row_hi + 1)
+
+        # Longitude span grows with latitude; near the poles the box covers every column
+        max_abs_lat = min(abs(lat) + dlat, 90.0)
+        cos_lat = np.cos(np.radians(max_abs_lat))
+        if cos_lat <= 1e-9 or radius_km / (KM_PER_DEG_LAT * cos_lat) >= 180:
+            col_ranges = [(0, self.n_cols - 1)]
+        else:
+            dlon = radius_km / (KM_PER_DEG_LAT * cos_lat)
+            col_lo, col_hi = self._col(lon - dlon), self._col(lon + dlon)
+            if col_lo <= col_hi:
+                col_ranges = [(col_lo, col_hi)]
+            else:
+                # Wraps around the antimeridian
+                col_ranges = [(col_lo, self.n_cols - 1), (0, col_hi)]
+
+        chunks = []
+        for col_lo, col_hi in col_ranges:
+            lo = np.searchsorted(self.sorted_keys, rows * self.n_cols + col_lo, side='left')
+            hi = np.searchsorted(self.sorted_keys, rows * self.n_cols + col_hi, side='right')
+            chunks.extend(self.order[a:b] for a, b in zip(lo, hi) if b > a)
+        if not chunks:
+            return np.array([], dtype=np.int64)
+        return np.concatenate(chunks)
+
+    def query_radius(self, lat, lon, radius_km):
+        """Indices and distances of points within radius_km, nearest first"""
+        candidates = self._box(lat, lon, radius_km)
+        distances = haversine_km(lat, lon, self.lats[candidates], self.lons[candidates])
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+        return candidates[order], distances[order]
+
+    def query_knn(self, lat, lon, k):
+        """Indices and distances of the k nearest points, nearest first"""
+        k = min(k, len(self))
+        if k <= 0:
+            return np.array([], dtype=np.int64), np.array([])
+
+        # Grow the search box until it holds k points. The k-th closest of
+        # those bounds the true k-th distance, so one radius query finishes it.
+        radius_km = self.cell_deg * KM_PER_DEG_LAT
+        while True:
+            candidates = self._box(lat, lon, radius_km)
+            if len(candidates) >= k or radius_km >= np.pi * EARTH_RADIUS_KM:
+                break
+            radius_km *= 2
+
+        distances = haversine_km(lat, lon, self.lats[candidates], self.lons[candidates])
+        kth = np.partition(distances, k - 1)[k - 1]
+        candidates, distances = self.query_radius(lat, lon, kth)
+        return candidates[:k], distances[:k]
+
+    def nearby(self, lat, lon, radius_km=None, k=None):
+        """Candidates within radius_km and/or the k nearest, nearest first"""
+        if radius_km is not None:
+            candidates, distances = self.query_radius(lat, lon, radius_km)
+            if k is not None:
+                candidates, distances = candidates[:k], distances[:k]
+            return candidates, distances
+        if k is not None:
+            return self.query_knn(lat, lon, k)
+        distances = haversine_km(lat, lon, self.lats, self.lons)
+        order = np.argsort(distances, kind='stable')
+        return order, distances[order]
+
+# Neighbours kept per point in the nearby graph; the most a nearby query can ask for
+NEARBY_K = int(os.getenv("NEARBY_K", "20"))
+
+# Upper bound on points x candidates distances computed at once while building the graph
+NEARBY_MAX_CELLS = 2_000_000
+# Grid cells holding more points than this are split on a finer grid while building
+NEARBY_MAX_CELL_POINTS = 256
+NEARBY_MIN_CELL_DEG = 1e-5
+
+def smallest_k(candidates, distances, k):
+    """Per row, the k smallest distances and their candidates, nearest first"""
+    k = min(k, distances.shape[1])
+    part = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    part_distances = np.take_along_axis(distances, part, axis=1)
+    order = np.argsort(part_distances, axis=1, kind='stable')
+    part = np.take_along_axis(part, order, axis=1)
+    return np.take_along_axis(candidates, part, axis=1), np.take_along_axis(part_distances, order, axis=1)
+
+def graph_cell_deg(lats, lons, k):
+    """Grid cell size that puts about k points in a cell if the points were spread evenly"""
+    area = max(np.ptp(lats) * np.ptp(lons), NEARBY_MIN_CELL_DEG ** 2)
+    return float(np.clip(np.sqrt(area * k / len(lats)), NEARBY_MIN_CELL_DEG, 10.0))
+
+class NearbyGraph:
+    """
+    k-nearest-neighbour graph over a set of points.
+
+    neighbours[i] holds the k points closest to point i (itself excluded),
+    nearest first, and distances[i] their distances in km. When there are
+    fewer than k other points the rest of the row is -1 / inf.
+    """
+
+    def __init__(self, neighbours, distances):
+        self.neighbours = neighbours
+        self.distances = distances
+
+    @property
+    def k(self):
+        return self.neighbours.shape[1]
+
+    def __len__(self):
+        return len(self.neighbours)
+
+    def nearby(self, row, k=None):
+        """Rows and distances of the k nearest neighbours of a point, nearest first"""
+        k = self.k if k is None else min(k, self.k)
+        rows, distances = self.neighbours[row, :k], self.distances[row, :k]
+        found = rows >= 0
+        return rows[found], distances[found]
+
+    @classmethod
+    def build(cls, lats, lons, k=NEARBY_K):
+        """Graph over all the given points"""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        graph = cls(np.full((len(lats), k), -1, dtype=np.int64), np.full((len(lats), k), np.inf))
+        graph._fill(lats, lons, np.arange(len(lats)))
+        return graph
+
+    @classmethod
+    def extend(cls, previous, previous_rows, lats, lons):
+        """
+        Graph over the given points, which are those of previous plus some new ones.
+
+        previous_rows[i] is the row of the previous graph's point i. Old
+        neighbour lists only take in added points that beat their current k-th
+        neighbour, so the update costs O(old points x added points) instead of
+        a full rebuild.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        n, k = len(lats), previous.k
+        graph = cls(np.full((n, k), -1, dtype=np.int64), np.full((n, k), np.inf))
+        previous_rows = np.asarray(previous_rows, dtype=np.int64)
+        graph.neighbours[previous_rows] = np.where(
+            previous.neighbours >= 0, previous_rows[previous.neighbours], -1
+        )
+        graph.distances[previous_rows] = previous.distances
+
+        added = np.setdiff1d(np.arange(n), previous_rows)
+        chunk = max(1, NEARBY_MAX_CELLS // max(1, len(previous_rows)))
+        for start in range(0, len(added), chunk):
+            new = added[start:start + chunk]
+            distances = haversine_km(
+                lats[previous_rows, None], lons[previous_rows, None], lats[new], lons[new]
+            )
+            closer = distances.min(axis=1) < graph.distances[previous_rows, -1]
+            rows = previous_rows[closer]
+            merged_rows, merged_distances = smallest_k(
+                np.hstack([graph.neighbours[rows], np.broadcast_to(new, (len(rows), len(new)))]),
+                np.hstack([graph.distances[rows], distances[closer]]),
+                k
+            )
+            graph.neighbours[rows] = merged_rows
+            graph.distances[rows] = merged_distances
+
+        graph._fill(lats, lons, added)
+        return graph
+
+    def _fill(self, lats, lons, rows, cell_deg=None):
+        """
+        Compute the neighbour lists of the given rows from scratch.
+
+        Points are handled one grid cell at a time. Every point within
+        radius_km of the cell centre is a candidate, so a point whose k-th
+        candidate is closer than radius_km minus its own offset from the
+        centre has its true neighbours; the rest retry with twice the radius.
+        Crowded cells are handed to a finer grid.
+        """
+        k = min(self.k, len(lats) - 1)
+        if k <= 0 or len(rows) == 0:
+            return
+
+        if cell_deg is None:
+            cell_deg = graph_cell_deg(lats, lons, k)
+        index = SpatialIndex(lats, lons, cell_deg=cell_deg)
+        rows = np.asarray(rows, dtype=np.int64)
+        keys = index._row(lats[rows]) * index.n_cols + index._col(lons[rows])
+        order = np.argsort(keys, kind='stable')
+        rows, keys = rows[order], keys[order]
+
+        crowded = []
+        for members in np.split(rows, np.flatnonzero(np.diff(keys)) + 1):
+            if len(members) > NEARBY_MAX_CELL_POINTS and cell_deg > NEARBY_MIN_CELL_DEG:
+                crowded.append(members)
+                continue
+
+            lat, lon = lats[members].mean(), lons[members].mean()
+            offsets = haversine_km(lat, lon, lats[members], lons[members])
+            radius_km = cell_deg * KM_PER_DEG_LAT + offsets.max()
+            while len(members):
+                candidates = index._box(lat, lon, radius_km)
+                everything = radius_km >= np.pi * EARTH_RADIUS_KM
+                if len(candidates) > k:
+                    done = np.zeros(len(members), dtype=bool)
+                    chunk = max(1, NEARBY_MAX_CELLS // len(candidates))
+                    for start in range(0, len(members), chunk):
+                        part = members[start:start + chunk]
+                        distances = haversine_km(
+                            lats[part, None], lons[part, None], lats[candidates], lons[candidates]
+                        )
+                        distances[part[:, None] == candidates[None, :]] = np.inf
+                        found, found_distances = smallest_k(
+                            np.broadcast_to(candidates, distances.shape), distances, k
+                        )
+                        exact = everything | (found_distances[:, -1] <= radius_km - offsets[start:start + chunk])
+                        self.neighbours[part[exact], :k] = found[exact]
+                        self.distances[part[exact], :k] = found_distances[exact]
+                        done[start:start + chunk] = exact
+                    members, offsets = members[~done], offsets[~done]
+                radius_km *= 2
+
+        if crowded:
+            self._fill(lats, lons, np.concatenate(crowded), max(cell_deg / 8, NEARBY_MIN_CELL_DEG))
+
+class DistanceMatrix:
+    """
+    Pairwise monument distances for the current catalog snapshot.
+
+    Small catalogs get one full matrix, computed on first use and kept until
+    the catalog is rebuilt; larger ones fall back to computing the sub-matrix
+    of the requested rows.
+    """
+
+    def __init__(self, method='haversine', max_monuments=DISTANCE_MATRIX_MAX_MONUMENTS):
+        self.method = method
+        self.max_monuments = max_monuments
+        self._state = None  # (catalog generation, matrix)
+        self._lock = threading.Lock()
+
+    def _matrix(self, snapshot):
+        state = self._state
+        if state is None or state[0] != snapshot.generation:
+            with self._lock:
+                state = self._state
+                if state is None or state[0] != snapshot.generation:
+                    matrix = pairwise_km(snapshot.store.latitude, snapshot.store.longitude, method=self.method)
+                    matrix.flags.writeable = False
+                    state = self._state = (snapshot.generation, matrix)
+        return state[1]
+
+    def between(self, snapshot, rows):
+        """Distances between the given catalog rows, in that order"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(snapshot.store) <= self.max_monuments:
+            return self._matrix(snapshot)[np.ix_(rows, rows)]
+        store = snapshot.store
+        return pairwise_km(store.latitude[rows], store.longitude[rows], method=self.method)
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+def geohash(lat, lon, precision=6):
+    """Standard base32 geohash of a point; precision 6 cells are about 1.2 x 0.6 km"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        # Bits alternate between longitude and latitude, starting with longitude
+        interval, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
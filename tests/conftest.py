@@ -0,0 +1,84 @@
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add the repository root to sys.path so tests import the top-level modules
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic_catalog import seed_catalog
+
+@pytest.fixture
+def catalog_db():
+    """Factory for seeded in-memory catalogs, disposed after the test"""
+    engines = []
+
+    def make(n_monuments, seed=0):
+        engine, Session = seed_catalog(n_monuments, seed)
+        engines.append(engine)
+        return engine, Session
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+@pytest.fixture
+def catalog(catalog_db, monkeypatch):
+    """Recommendations and itineraries reading a 2,000-monument synthetic catalog"""
+    import itinerary
+    import recommendation
+    from catalog import Catalog
+
+    _, Session = catalog_db(2_000)
+    catalog = Catalog(session_factory=Session)
+    # Event scores are cached by catalog generation, which restarts with every catalog
+    event_score_vector = recommendation.EventScoreVector()
+    for module in (recommendation, itinerary):
+        monkeypatch.setattr(module, "monument_catalog", catalog)
+        monkeypatch.setattr(module, "event_score_vector", event_score_vector)
+    return catalog
+
+TOKENS = [f"token{i} " for i in range(20)]
+
+class StubOllama:
+    def __init__(self, **kwargs):
+        pass
+
+    def stream(self, prompt):
+        yield from TOKENS
+
+class StubRAGAgent:
+    def get_rag_prompt(self, prompt):
+        return prompt
+
+    def add_to_history(self, prompt, response):
+        pass
+
+    def clear_history(self):
+        pass
+
+@pytest.fixture
+def main(catalog, monkeypatch):
+    """The app module, imported with the LLM and RAG dependencies stubbed out, serving the synthetic catalog"""
+    import recommendation
+    llms = types.ModuleType("langchain_community.llms")
+    llms.Ollama = StubOllama
+    langchain_community = types.ModuleType("langchain_community")
+    langchain_community.llms = llms
+    rag_agent = types.ModuleType("RAGAgent")
+    rag_agent.RAGAgent = StubRAGAgent
+    monkeypatch.setitem(sys.modules, "langchain_community", langchain_community)
+    monkeypatch.setitem(sys.modules, "langchain_community.llms", llms)
+    monkeypatch.setitem(sys.modules, "RAGAgent", rag_agent)
+    monkeypatch.delitem(sys.modules, "main", raising=False)
+    monkeypatch.chdir(REPO_ROOT)
+
+    module = importlib.import_module("main")
+    monkeypatch.setattr(module, "monument_catalog", catalog)
+    monkeypatch.setattr(module, "event_score_vector", recommendation.event_score_vector)
+    yield module
+    sys.modules.pop("main", None)
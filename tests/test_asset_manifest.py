@@ -0,0 +1,69 @@
+import hashlib
+import os
+
+from asset_manifest import AssetManifest, MissingImages, missing_images
+from metrics import render_metrics
+
+class FakeSnapshot:
+    def __init__(self, image_urls, generation=1):
+        self.monuments = [{'image_url': url} for url in image_urls]
+        self.generation = generation
+
+def test_refresh_indexes_files(tmp_path):
+    (tmp_path / "a.jpg").write_bytes(b"a" * 10)
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.jpg").write_bytes(b"b")
+    manifest = AssetManifest(tmp_path)
+    assert manifest.refresh() == 2
+    assert "a.jpg" in manifest and "sub/b.jpg" in manifest
+    entry = manifest.get("a.jpg")
+    assert entry.size == 10
+    assert entry.sha256 == hashlib.sha256(b"a" * 10).hexdigest()
+
+def test_version_moves_only_when_files_come_or_go(tmp_path):
+    (tmp_path / "a.jpg").write_bytes(b"a")
+    manifest = AssetManifest(tmp_path)
+    manifest.refresh()
+    version = manifest.version
+    unchanged = manifest.get("a.jpg")
+
+    manifest.refresh()
+    assert manifest.version == version
+    # Unchanged files keep their entry (and hash) across scans
+    assert manifest.get("a.jpg") is unchanged
+
+    (tmp_path / "b.jpg").write_bytes(b"b")
+    manifest.refresh()
+    assert manifest.version == version + 1
+
+    os.remove(tmp_path / "a.jpg")
+    manifest.refresh()
+    assert manifest.version == version + 2
+    assert "a.jpg" not in manifest
+
+def test_missing_images_gauge_follows_manifest_and_snapshot(tmp_path):
+    (tmp_path / "a.jpg").write_bytes(b"a")
+    manifest = AssetManifest(tmp_path)
+    tracker = MissingImages(manifest)
+    snapshot = FakeSnapshot(["/assets/a.jpg", "/assets/b.jpg", "/assets/c.jpg", None])
+    assert tracker.update(snapshot) is None
+
+    manifest.refresh()
+    assert tracker.update(snapshot) == 2
+    assert missing_images.value() == 2
+    # Repeated requests do not recount
+    snapshot.monuments.append({'image_url': "/assets/d.jpg"})
+    assert tracker.update(snapshot) == 2
+
+    (tmp_path / "b.jpg").write_bytes(b"b")
+    manifest.refresh()
+    assert tracker.update(snapshot) == 2
+
+    assert tracker.update(FakeSnapshot(["/assets/a.jpg"], generation=2)) == 0
+
+def test_missing_images_metric_has_one_series(tmp_path):
+    manifest = AssetManifest(tmp_path)
+    manifest.refresh()
+    MissingImages(manifest).update(FakeSnapshot([f"/assets/{i}.jpg" for i in range(100)]))
+    lines = [line for line in render_metrics().splitlines() if line.startswith("monument_missing_images")]
+    assert lines == ["monument_missing_images 100"]
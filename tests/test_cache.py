@@ -0,0 +1,31 @@
+from cache import LRUCache
+from metrics import render_metrics
+
+def test_older_generation_misses_without_flushing():
+    cache = LRUCache(8)
+    cache.put('a', 1, 6)
+    # A request still holding the previous snapshot
+    assert cache.get('x', 5) is None
+    cache.put('x', 2, 5)
+    assert cache.get('a', 6) == 1
+    assert cache.get('x', 6) is None
+
+def test_newer_generation_drops_old_entries():
+    cache = LRUCache(8)
+    cache.put('a', 1, 1)
+    assert cache.get('a', 2) is None
+    cache.put('a', 2, 2)
+    assert cache.get('a', 2) == 2
+    assert cache.get('a', 1) is None
+    assert cache.get('a', 2) == 2
+
+def test_named_cache_reports_metrics():
+    cache = LRUCache(8, name="test_cache")
+    cache.put('a', 1)
+    cache.get('a')
+    cache.get('a')
+    cache.get('b')
+    lines = render_metrics().splitlines()
+    assert 'cache_hits{cache="test_cache"} 2' in lines
+    assert 'cache_misses{cache="test_cache"} 1' in lines
+    assert 'cache_entries{cache="test_cache"} 1' in lines
@@ -0,0 +1,99 @@
+import threading
+import time
+
+from sqlalchemy import update
+from sqlalchemy.dialects import mysql
+
+from catalog import Catalog, catalog_version
+from benchmarks.synthetic_catalog import SLOTS
+from models import Monument, MonumentSlot
+from monument_store import TIME_SLOTS
+
+def monument(snapshot, monument_id):
+    return snapshot.monuments[snapshot.rows_by_id[monument_id]]
+
+def best_time(snapshot, monument_id):
+    return TIME_SLOTS[snapshot.store.best_time_codes[snapshot.rows_by_id[monument_id]]]
+
+def test_edit_from_another_process_rebuilds_snapshot(catalog_db):
+    engine, Session = catalog_db(50)
+    catalog = Catalog(session_factory=Session, check_interval=0)
+    before = catalog.get()
+
+    # A Core connection stands in for another worker: no session hooks fire in this process
+    with engine.begin() as conn:
+        conn.execute(update(Monument).where(Monument.monument_id == 7).values(description="Edited", popularity=0.99))
+
+    after = catalog.get()
+    assert after is not before
+    assert after.generation == before.generation + 1
+    assert monument(after, 7)['description'] == "Edited"
+    assert monument(after, 7)['popularity'] == 0.99
+    assert after.version != before.version
+
+def test_moved_slot_rebuilds_snapshot(catalog_db):
+    engine, Session = catalog_db(50)
+    catalog = Catalog(session_factory=Session, check_interval=0)
+    before = catalog.get()
+    old_slot = best_time(before, 3)
+    new_slot_id = {'morning': 2, 'afternoon': 3, 'evening': 1}[old_slot]
+
+    # Same row counts and max keys; only updated_at moves
+    with engine.begin() as conn:
+        conn.execute(update(MonumentSlot).where(MonumentSlot.monument_id == 3).values(slot_id=new_slot_id))
+
+    after = catalog.get()
+    assert after is not before
+    assert best_time(after, 3) == SLOTS[new_slot_id - 1]
+
+def test_unchanged_tables_keep_snapshot(catalog_db):
+    _, Session = catalog_db(50)
+    catalog = Catalog(session_factory=Session, check_interval=0)
+    assert catalog.get() is catalog.get()
+
+def test_orm_edit_uses_database_clock(catalog_db):
+    _, Session = catalog_db(50)
+    db = Session()
+    try:
+        before = catalog_version(db)
+        seeded = db.get(Monument, 5).updated_at
+        # SQLite keeps milliseconds
+        time.sleep(0.01)
+        db.get(Monument, 5).popularity = 0.5
+        db.commit()
+        assert db.get(Monument, 5).updated_at > seeded
+        assert catalog_version(db) != before
+    finally:
+        db.close()
+
+def test_updated_at_matches_migration_on_mysql():
+    default = Monument.__table__.c.updated_at.onupdate.arg
+    assert str(default.compile(dialect=mysql.dialect())) == "CURRENT_TIMESTAMP(6)"
+
+def test_refresh_does_not_block_other_readers(catalog_db):
+    _, Session = catalog_db(50)
+    refreshing = threading.Event()
+    released = threading.Event()
+
+    def slow_session():
+        if refreshing.is_set():
+            released.wait(5)
+        return Session()
+
+    catalog = Catalog(session_factory=slow_session, check_interval=0)
+    before = catalog.get()
+    catalog.invalidate()
+    refreshing.set()
+    refresh = threading.Thread(target=catalog.get)
+    refresh.start()
+    try:
+        # Wait until the refreshing thread holds the lock
+        while not catalog._lock.locked():
+            time.sleep(0.001)
+        start = time.monotonic()
+        assert catalog.get() is before
+        assert time.monotonic() - start < 1
+    finally:
+        released.set()
+        refresh.join()
+    assert catalog.get() is not before
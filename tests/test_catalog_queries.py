@@ -0,0 +1,28 @@
+from sqlalchemy import event
+
+from catalog import load_catalog_data
+
+def count_statements(engine, fn):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements), result
+
+def test_query_count_does_not_grow_with_catalog(catalog_db):
+    counts = {}
+    for n_monuments in (10, 1_000, 10_000):
+        engine, Session = catalog_db(n_monuments)
+        db = Session()
+        try:
+            counts[n_monuments], (monuments, _) = count_statements(engine, lambda: load_catalog_data(db))
+        finally:
+            db.close()
+        assert len(monuments) == n_monuments
+    assert len(set(counts.values())) == 1, counts
@@ -0,0 +1,40 @@
+import threading
+
+from fastapi.testclient import TestClient
+
+from conftest import TOKENS
+
+# How long the stubbed recommendation waits to be released before giving up
+RELEASE_TIMEOUT = 5.0
+
+def test_chat_keeps_streaming_while_recommendations_run(main, monkeypatch):
+    started = threading.Event()
+    released = threading.Event()
+    finished = threading.Event()
+
+    def blocking_recommend_monuments(*args, **kwargs):
+        started.set()
+        released.wait(RELEASE_TIMEOUT)
+        finished.set()
+        return []
+
+    monkeypatch.setattr(main, "recommend_monuments", blocking_recommend_monuments)
+
+    with TestClient(main.app) as client:
+        recommendation = threading.Thread(target=lambda: client.post("/getRecommendations", json={}))
+        recommendation.start()
+        try:
+            assert started.wait(RELEASE_TIMEOUT)
+            with client.websocket_connect("/chat") as websocket:
+                websocket.send_text("hello")
+                received = []
+                while (message := websocket.receive_text()) != "[DONE]":
+                    received.append(message)
+                # The whole reply went out while the recommendation was still blocked
+                still_running = not finished.is_set()
+        finally:
+            released.set()
+            recommendation.join()
+
+    assert received == TOKENS
+    assert still_running
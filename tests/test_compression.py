@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+
+def test_not_modified_matches_compressed_response(main):
+    with TestClient(main.app) as client:
+        first = client.get("/getMonuments", headers={"Accept-Encoding": "gzip"})
+        assert first.status_code == 200
+        assert first.headers["content-encoding"] == "gzip"
+        etag = first.headers["etag"]
+        assert etag.startswith("W/")
+
+        second = client.get("/getMonuments", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["etag"] == etag
+        assert "accept-encoding" in second.headers["vary"].lower()
+        assert "content-encoding" not in second.headers
+
+def test_not_modified_without_encoding_is_untouched(main):
+    with TestClient(main.app) as client:
+        etag = client.get("/getMonuments", headers={"Accept-Encoding": "identity"}).headers["etag"]
+        assert not etag.startswith("W/")
+        second = client.get("/getMonuments", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.headers["etag"] == etag
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from geopy.distance import geodesic
+
+from distance import ellipsoidal_km, haversine_km
+
+def random_points(n, seed, lat_range=(-89.0, 89.0), lon_range=(-180.0, 180.0)):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(*lat_range, n), rng.uniform(*lon_range, n)
+
+def geopy_km(lat, lon, lats, lons):
+    return np.array([geodesic((lat, lon), (a, b)).km for a, b in zip(lats, lons)])
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ellipsoidal_matches_geodesic_worldwide(seed):
+    lats, lons = random_points(500, seed)
+    lat, lon = lats[0], lons[0]
+    expected = geopy_km(lat, lon, lats, lons)
+    # Vincenty does not converge for nearly antipodal pairs and falls back to haversine
+    regular = haversine_km(lat, lon, lats, lons) < 19000
+    got = ellipsoidal_km(lat, lon, lats, lons)
+    np.testing.assert_allclose(got[regular], expected[regular], rtol=0, atol=1e-5)
+    np.testing.assert_allclose(got[~regular], expected[~regular], rtol=0.006)
+
+def test_ellipsoidal_matches_geodesic_in_nepal():
+    lats, lons = random_points(1000, 10, lat_range=(26.35, 30.45), lon_range=(80.05, 88.20))
+    expected = geopy_km(27.7104, 85.3487, lats, lons)
+    np.testing.assert_allclose(ellipsoidal_km(27.7104, 85.3487, lats, lons), expected, rtol=0, atol=1e-6)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_haversine_within_half_a_percent_of_geodesic(seed):
+    lats, lons = random_points(500, seed)
+    lat, lon = lats[0], lons[0]
+    expected = geopy_km(lat, lon, lats, lons)
+    # Spherical vs ellipsoidal earth: at most about 0.56% apart, plus slack for coincident points
+    np.testing.assert_allclose(haversine_km(lat, lon, lats, lons), expected, rtol=0.006, atol=1e-9)
+
+@pytest.mark.parametrize("fn", [haversine_km, ellipsoidal_km])
+def test_coincident_and_antipodal_points(fn):
+    lats = np.array([27.7, -27.7, 0.0])
+    lons = np.array([85.3, -94.7, 85.3])
+    got = fn(27.7, 85.3, lats, lons)
+    expected = geopy_km(27.7, 85.3, lats, lons)
+    assert got[0] == 0
+    assert np.all(np.isfinite(got))
+    np.testing.assert_allclose(got, expected, rtol=0.006)
+
+@pytest.mark.parametrize("fn", [haversine_km, ellipsoidal_km])
+def test_broadcasts_like_scalar_calls(fn):
+    lats, lons = random_points(50, 20)
+    got = fn(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+    assert got.shape == (50, 50)
+    for i in (0, 17, 49):
+        np.testing.assert_allclose(got[i], fn(lats[i], lons[i], lats, lons))
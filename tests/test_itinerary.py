@@ -0,0 +1,21 @@
+import pytest
+
+from distance import haversine_km
+from itinerary import ITINERARY_SPEED_KMH, ITINERARY_VISIT_MINUTES, plan_itinerary
+from recommendation import recommend_monuments
+
+USER = (27.7104, 85.3487, 'Hindu Temple')
+
+@pytest.mark.parametrize("time_budget_minutes, max_stops", [(240, 3), (480, 5), (720, 8)])
+def test_stops_are_the_best_recommendations_within_reach(catalog, time_budget_minutes, max_stops):
+    reach_km = ITINERARY_SPEED_KMH * (time_budget_minutes - ITINERARY_VISIT_MINUTES) / 60
+    full = recommend_monuments(*USER)
+    distances = haversine_km(USER[0], USER[1], [m['latitude'] for m in full], [m['longitude'] for m in full])
+    best_within_reach = [m['id'] for m, d in zip(full, distances) if d <= reach_km][:max_stops]
+
+    plan = plan_itinerary(*USER, time_budget_minutes=time_budget_minutes, max_stops=max_stops)
+    stops = [stop['id'] for stop in plan['stops']]
+    assert stops
+    # Stops that do not fit the budget are dropped, but nothing else may take their place
+    assert set(stops) <= set(best_within_reach)
+    assert plan['total_minutes'] <= time_budget_minutes
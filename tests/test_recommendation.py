@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+import recommendation
+from cache import LRUCache
+from distance import haversine_km
+from recommendation import iter_monument_records, rank_monuments, recommend_monuments
+
+USER = (27.7104, 85.3487, 'Hindu Temple')
+
+def ids(results):
+    return [monument['id'] for monument in results]
+
+@pytest.mark.parametrize("radius_km", [30, 60, 100])
+def test_radius_pruning_keeps_full_ranking(catalog, radius_km):
+    full = recommend_monuments(*USER)
+    assert len(full) == 2_000
+    distances = haversine_km(USER[0], USER[1], [m['latitude'] for m in full], [m['longitude'] for m in full])
+    expected = [m['id'] for m, d in zip(full, distances) if d <= radius_km]
+    assert expected
+
+    assert ids(recommend_monuments(*USER, radius_km=radius_km)) == expected
+
+@pytest.mark.parametrize("nearest", [5, 50, 500])
+def test_nearest_pruning_keeps_full_ranking(catalog, nearest):
+    full = recommend_monuments(*USER)
+    distances = haversine_km(USER[0], USER[1], [m['latitude'] for m in full], [m['longitude'] for m in full])
+    nearest_ids = {full[i]['id'] for i in np.argsort(distances, kind='stable')[:nearest]}
+    expected = [m['id'] for m in full if m['id'] in nearest_ids]
+
+    assert ids(recommend_monuments(*USER, nearest=nearest)) == expected
+
+def test_pruned_page_is_a_page_of_the_pruned_ranking(catalog):
+    pruned = ids(recommend_monuments(*USER, radius_km=60))
+    assert ids(recommend_monuments(*USER, radius_km=60, limit=5, offset=3)) == pruned[3:8]
+
+@pytest.mark.parametrize("kwargs", [{}, {'limit': 10, 'offset': 5}, {'radius_km': 60}, {'diversity': 0.5, 'limit': 20}])
+def test_lazy_records_match_recommend_monuments(catalog, kwargs):
+    store, rows = rank_monuments(*USER, **kwargs)
+    assert list(iter_monument_records(store, rows)) == recommend_monuments(*USER, **kwargs)
+
+def test_cached_ranking_matches_uncached(catalog, monkeypatch):
+    uncached = recommend_monuments(*USER, radius_km=60, limit=10)
+    monkeypatch.setattr(recommendation, "recommendation_cache", LRUCache(maxsize=16))
+    assert recommend_monuments(*USER, radius_km=60, limit=10) == uncached
+    assert recommend_monuments(*USER, radius_km=60, limit=10) == uncached
+    assert recommendation.recommendation_cache.hits == 1
+
+def full_ranking(weights):
+    return np.argsort(-weights, kind='stable')
+
+@pytest.mark.parametrize("k", [1, 7, 50, 300])
+def test_top_k_breaks_ties_in_catalog_order(k):
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        # Few distinct values, so most cut-offs fall inside a run of ties
+        weights = rng.integers(0, 5, 1000).astype(float)
+        expected = full_ranking(weights)
+        assert np.array_equal(recommendation.top_k(weights, k), expected[:k])
+        assert np.array_equal(recommendation.top_k(weights, k, offset=k), expected[k:2 * k])
+
+def test_tied_pages_neither_repeat_nor_skip():
+    weights = np.repeat([3.0, 2.0, 1.0], 40)
+    pages = [recommendation.top_k(weights, 7, offset) for offset in range(0, len(weights), 7)]
+    assert np.array_equal(np.concatenate(pages), np.arange(len(weights)))
+
+def test_range_top_k_merge_matches_full_ranking():
+    # How ParallelScorer merges the per-range top k of its workers
+    rng = np.random.default_rng(1)
+    weights = rng.integers(0, 3, 999).astype(float)
+    k = 40
+    bounds = [(0, 333), (333, 666), (666, 999)]
+    rows = np.concatenate([recommendation.top_k(weights[a:b], k) + a for a, b in bounds])
+    merged = rows[np.lexsort((rows, -weights[rows]))][:k]
+    assert np.array_equal(merged, full_ranking(weights)[:k])
+
+def test_batch_top_k_breaks_ties_in_catalog_order():
+    rng = np.random.default_rng(2)
+    weights = rng.integers(0, 4, (50, 400)).astype(float)
+    for k in (1, 9, 100, 400):
+        expected = np.stack([full_ranking(row)[:k] for row in weights])
+        assert np.array_equal(recommendation.top_k_rows(weights, k), expected)
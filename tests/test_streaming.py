@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+import recommendation
+
+NDJSON = {'accept': 'application/x-ndjson'}
+
+def test_ndjson_recommendations_match_json(main):
+    with TestClient(main.app) as client:
+        expected = client.post("/getRecommendations", json={}).json()
+        response = client.post("/getRecommendations", json={}, headers=NDJSON)
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    assert [json.loads(line) for line in response.text.splitlines()] == expected
+    assert len(expected) == 2_000
+
+def test_ndjson_recommendations_build_records_lazily(main, monkeypatch):
+    built = []
+    iter_records = recommendation.iter_monument_records
+
+    def counting_iter(store, rows):
+        for record in iter_records(store, rows):
+            built.append(record['id'])
+            yield record
+
+    def no_full_list(*args, **kwargs):
+        raise AssertionError("the NDJSON path must not build every record up front")
+
+    monkeypatch.setattr(main, "iter_monument_records", counting_iter)
+    monkeypatch.setattr(main, "recommend_monuments", no_full_list)
+    monkeypatch.setattr(recommendation, "monument_records", no_full_list)
+
+    async def stream():
+        request = Request({'type': 'http', 'method': 'POST', 'headers': [(b'accept', b'application/x-ndjson')]})
+        response = await main.get_recommendations(request, main.RecommendationRequest())
+        chunks = response.body_iterator
+        # Ranked, but no record built until the body is read
+        assert built == []
+        first = await anext(chunks)
+        assert len(built) == main.NDJSON_CHUNK_LINES
+        return [first] + [chunk async for chunk in chunks]
+
+    chunks = asyncio.run(stream())
+    assert sum(chunk.count("\n") for chunk in chunks) == len(built) == 2_000